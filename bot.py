@@ -3,8 +3,14 @@ Thesis Bot — Discord Interface
 Handles all Discord communication, routes messages to the orchestrator,
 and manages heartbeats and status updates.
 """
+import io
 import os
+import time
 import asyncio
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from typing import Any
+
 import discord
 from discord.ext import commands, tasks
 from dotenv import load_dotenv
@@ -18,7 +24,12 @@ from config import (
     CHANNEL_STATUS,
     CHANNEL_OUTPUT,
     CHANNEL_ERRORS,
+    CHANNEL_EXPERIMENTS,
+    CHANNEL_SLURM,
     HEARTBEAT_INTERVAL_SECONDS,
+    DEFAULT_TASK_BUDGET,
+    PENDING_CHECKPOINTS_MAX,
+    PENDING_CHECKPOINT_TTL_SECONDS,
 )
 from orchestrator import process_task, continue_task, get_status, recover_stale_tasks
 
@@ -26,19 +37,259 @@ from orchestrator import process_task, continue_task, get_status, recover_stale_
 
 intents = discord.Intents.default()
 intents.message_content = True
-intents.reactions = True
+intents.reactions = True  # gateway reaction events; handled raw, so no cache needed
+
+
+class ThesisBot(commands.Bot):
+    """Bot that also closes the shared DB connection on shutdown."""
+
+    async def close(self):
+        await super().close()
+        await db.close_db()
 
-bot = commands.Bot(command_prefix="!", intents=intents)
 
-# Channel cache (populated on_ready)
-channels = {}
+# Nothing reads discord.py's message cache (plan approval uses raw
+# reaction events and keeps its own message refs), so don't keep one
+bot = ThesisBot(command_prefix="!", intents=intents, max_messages=None)
+
+# Channel cache (populated on_ready, kept fresh by guild channel events)
+channels: dict[str, int] = {}                       # name -> channel id
+_channel_by_id: dict[int, discord.TextChannel] = {}
+# IDs of every #commands channel across guilds
+_command_channel_ids: set[int] = set()
+# Only these channel names are ever looked up
+_NEEDED_CHANNELS = frozenset({
+    CHANNEL_COMMANDS, CHANNEL_STATUS, CHANNEL_OUTPUT,
+    CHANNEL_ERRORS, CHANNEL_EXPERIMENTS, CHANNEL_SLURM,
+})
+
+_DM = discord.DMChannel
+
+# Reaction / status emoji
+_EMOJI_PROCESSING = "\U0001f504"  # 🔄
+_EMOJI_OK = "\u2705"              # ✅
+_EMOJI_FAIL = "\u274c"            # ❌
+_EMOJI_WARN = "\u26a0\ufe0f"      # ⚠️
+_EMOJI_PAUSE = "\u23f8\ufe0f"     # ⏸️
+
+# Subtask status -> icon for progress notifications
+_STATUS_ICONS: dict[str, str] = {
+    "completed": _EMOJI_OK,
+    "failed": _EMOJI_FAIL,
+    "stalled": _EMOJI_WARN,
+}
+
+# Strong refs to fire-and-forget tasks so they aren't garbage-collected mid-flight
+_bg_tasks: set[asyncio.Task] = set()
+
+
+def _spawn(coro) -> asyncio.Task:
+    """Schedule a coroutine in the background and keep it alive until done."""
+    task = asyncio.get_running_loop().create_task(coro)
+    _bg_tasks.add(task)
+    task.add_done_callback(_bg_tasks.discard)
+    return task
+
+
+class _CheckpointCache:
+    """
+    Bounded, TTL-expiring map of pending planner checkpoints.
+
+    Dict-compatible for the operations bot.py uses. Expired or evicted
+    entries have their task marked failed so the DB doesn't keep them
+    in 'checkpoint' forever.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self._maxsize = maxsize
+        self._ttl = ttl
+        self._data: OrderedDict[int, tuple[float, dict]] = OrderedDict()
+
+    def _expire(self):
+        now = time.monotonic()
+        while self._data:
+            key, (expires_at, _) = next(iter(self._data.items()))
+            if expires_at > now:
+                break
+            self._evict(key)
+
+    def _evict(self, key: int):
+        _, checkpoint = self._data.pop(key)
+        _spawn(db.update_task(
+            checkpoint["task_id"], status="failed", error="Checkpoint timed out",
+        ))
+        _spawn(db.delete_task_messages(checkpoint["task_id"]))
+
+    def __contains__(self, key: int) -> bool:
+        self._expire()
+        return key in self._data
+
+    def __getitem__(self, key: int) -> dict:
+        self._expire()
+        return self._data[key][1]
+
+    def __setitem__(self, key: int, value: dict):
+        self._expire()
+        self._data.pop(key, None)
+        while len(self._data) >= self._maxsize:
+            self._evict(next(iter(self._data)))
+        self._data[key] = (time.monotonic() + self._ttl, value)
+
+    def __delitem__(self, key: int):
+        del self._data[key]
+
 
-# Active planner checkpoints: message_id -> {task_id, conversation_history, budget}
-_pending_checkpoints: dict[int, dict] = {}
+# Active planner checkpoints: message_id -> {task_id, budget, ...}
+_pending_checkpoints = _CheckpointCache(PENDING_CHECKPOINTS_MAX, PENDING_CHECKPOINT_TTL_SECONDS)
+
+
+# Discord has a 2000 char limit; leave headroom for the [i/n] prefix
+_CHUNK_SIZE = 1990
+
+# === Outbound pacing ===
+# Every Discord write (send/reply/react) goes through a per-channel queue so
+# bursts stay under the ~50 req/s global and 5 msgs / 5 s per-channel limits.
+# Each channel has its own consumer, so one channel waiting out its window
+# doesn't hold up the others; all consumers share the global token bucket.
+_GLOBAL_RATE = 45.0      # requests per second, with headroom under 50
+_CHANNEL_BURST = 5
+_CHANNEL_WINDOW = 5.0    # seconds
+
+# channel id -> pending (op, future, counts_as_message); present while its consumer runs
+_channel_sends: dict[int, deque[tuple[Callable[[], Awaitable[Any]], asyncio.Future, bool]]] = {}
+# channel id -> dispatch times of recent messages (reactions aren't counted)
+_channel_recent: dict[int, deque[float]] = defaultdict(deque)
 
 
 def _get_channel(name: str) -> discord.TextChannel | None:
-    return channels.get(name)
+    return _channel_by_id.get(channels.get(name))
+
+
+def _cache_channel(channel: discord.TextChannel):
+    if channel.name not in _NEEDED_CHANNELS:
+        return
+    channels[channel.name] = channel.id
+    _channel_by_id[channel.id] = channel
+    if channel.name == CHANNEL_COMMANDS:
+        _command_channel_ids.add(channel.id)
+
+
+def _uncache_channel(channel: discord.TextChannel):
+    _channel_by_id.pop(channel.id, None)
+    _command_channel_ids.discard(channel.id)
+    if channels.get(channel.name) == channel.id:
+        del channels[channel.name]
+
+
+def _iter_chunks(content: str, size: int = _CHUNK_SIZE) -> Iterator[str]:
+    """Yield consecutive slices of content, each at most size chars."""
+    for i in range(0, len(content), size):
+        yield content[i:i + size]
+
+
+async def _enqueue_send(channel, op: Callable[[], Awaitable[Any]], message: bool = True) -> Any:
+    """
+    Queue a Discord API call against channel and wait for its result.
+
+    message=False for calls (reactions) that don't count toward the
+    per-channel message limit; they still take a global token.
+    """
+    fut = asyncio.get_running_loop().create_future()
+    pending = _channel_sends.get(channel.id)
+    if pending is None:
+        pending = _channel_sends[channel.id] = deque()
+        _spawn(_channel_worker(channel.id, pending))
+    pending.append((op, fut, message))
+    return await fut
+
+
+async def _send(channel, *args, **kwargs) -> discord.Message:
+    return await _enqueue_send(channel, lambda: channel.send(*args, **kwargs))
+
+
+async def _reply(message: discord.Message, *args, **kwargs) -> discord.Message:
+    return await _enqueue_send(message.channel, lambda: message.reply(*args, **kwargs))
+
+
+async def _react(message: discord.Message, emoji: str):
+    await _enqueue_send(message.channel, lambda: message.add_reaction(emoji), message=False)
+
+
+async def _unreact(message: discord.Message, emoji: str):
+    """Remove the bot's own reaction, ignoring messages that are gone."""
+    try:
+        await _enqueue_send(message.channel, lambda: message.remove_reaction(emoji, bot.user), message=False)
+    except discord.errors.NotFound:
+        pass
+
+
+async def _run_send(op: Callable[[], Awaitable[Any]], fut: asyncio.Future):
+    """Execute one queued call, retrying once on 429, and resolve its future."""
+    try:
+        try:
+            result = await op()
+        except discord.HTTPException as e:
+            if e.status != 429:
+                raise
+            retry_after = float(e.response.headers.get("Retry-After", 1.0))
+            await asyncio.sleep(retry_after)
+            result = await op()
+    except Exception as e:
+        if not fut.done():
+            fut.set_exception(e)
+    else:
+        if not fut.done():
+            fut.set_result(result)
+
+
+class _TokenBucket:
+    """Global request budget shared by all channel consumers."""
+
+    def __init__(self, rate: float):
+        self.rate = rate
+        self.tokens = rate
+        self.last = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self):
+        async with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.rate, self.tokens + (now - self.last) * self.rate)
+            self.last = now
+            if self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self.tokens = 1.0
+                self.last = time.monotonic()
+            self.tokens -= 1
+
+
+_global_bucket = _TokenBucket(_GLOBAL_RATE)
+
+
+async def _channel_worker(channel_id: int, pending: deque):
+    """Dispatch one channel's queued calls in order under its sliding window."""
+    window = _channel_recent[channel_id]
+    try:
+        while pending:
+            op, fut, message = pending.popleft()
+            if message:
+                now = time.monotonic()
+                while window and now - window[0] >= _CHANNEL_WINDOW:
+                    window.popleft()
+                if len(window) >= _CHANNEL_BURST:
+                    await asyncio.sleep(_CHANNEL_WINDOW - (now - window[0]))
+                    window.popleft()
+            await _global_bucket.take()
+            if message:
+                window.append(time.monotonic())
+
+            # Pacing only gates dispatch; in-flight calls overlap
+            _spawn(_run_send(op, fut))
+    finally:
+        # No await between the empty check and here, so no call is stranded
+        del _channel_sends[channel_id]
+        for _, fut, _ in pending:  # only non-empty if cancelled
+            fut.cancel()
 
 
 async def _send_to_channel(channel_name: str, content: str):
@@ -47,11 +298,8 @@ async def _send_to_channel(channel_name: str, content: str):
     if not ch:
         print(f"Warning: channel #{channel_name} not found")
         return
-    # Discord has 2000 char limit
-    while content:
-        chunk = content[:1990]
-        content = content[1990:]
-        await ch.send(chunk)
+    for chunk in _iter_chunks(content):
+        await _send(ch, chunk)
 
 
 # === Events ===
@@ -64,10 +312,10 @@ async def on_ready():
     # Initialize database
     await db.init_db()
 
-    # Cache channel references
+    # Cache channel references (_cache_channel skips ones the bot doesn't use)
     for guild in bot.guilds:
         for channel in guild.text_channels:
-            channels[channel.name] = channel
+            _cache_channel(channel)
 
     print(f"Found channels: {list(channels.keys())}")
     # Crash recovery
@@ -84,6 +332,25 @@ async def on_ready():
         heartbeat_loop.start()
 
 
+@bot.event
+async def on_guild_channel_create(channel: discord.abc.GuildChannel):
+    if isinstance(channel, discord.TextChannel):
+        _cache_channel(channel)
+
+
+@bot.event
+async def on_guild_channel_update(before: discord.abc.GuildChannel, after: discord.abc.GuildChannel):
+    if isinstance(after, discord.TextChannel):
+        _uncache_channel(before)
+        _cache_channel(after)
+
+
+@bot.event
+async def on_guild_channel_delete(channel: discord.abc.GuildChannel):
+    if isinstance(channel, discord.TextChannel):
+        _uncache_channel(channel)
+
+
 @bot.event
 async def on_message(message: discord.Message):
     """Handle incoming messages."""
@@ -91,200 +358,209 @@ async def on_message(message: discord.Message):
     if message.author == bot.user:
         return
 
-    # Process commands first (like !status, !cost)
-    await bot.process_commands(message)
-
-    # Only respond to messages in #commands or DMs that aren't commands
-    is_command_channel = message.channel.name == CHANNEL_COMMANDS if hasattr(message.channel, "name") else False
-    is_dm = isinstance(message.channel, discord.DMChannel)
+    content = message.content
 
-    if not (is_command_channel or is_dm):
+    # Bot commands (like !status, !cost) — only these need the command parser
+    if content.startswith("!"):
+        await bot.process_commands(message)
         return
 
-    # Skip if it was a bot command (starts with !)
-    if message.content.startswith("!"):
+    # Only respond to messages in #commands or DMs
+    channel = message.channel
+    if channel.id not in _command_channel_ids and not isinstance(channel, _DM):
         return
 
-    # This is a task — process it
-    task_description = message.content.strip()
-    if not task_description:
+    # This is a task unless empty or an indented command (e.g. "  !status")
+    task_description = content.strip()
+    if not task_description or task_description[0] == "!":
         return
 
     # Acknowledge
-    await message.add_reaction("\U0001f504")  # 🔄
+    await _react(message, _EMOJI_PROCESSING)
 
     # Progress callback for subtask notifications
     async def _progress_cb(event: str, data: dict):
         if event == "subtask_completed":
-            status_icon = {
-                "completed": "\u2705",
-                "failed": "\u274c",
-                "stalled": "\u26a0\ufe0f",
-            }.get(data.get("status", ""), "\u2705")
-            await message.channel.send(
+            status_icon = _STATUS_ICONS.get(data.get("status", ""), _EMOJI_OK)
+            await _send(message.channel,
                 f"> {status_icon} Subtask done: {data['description'][:80]} (${data['cost']:.4f})"
             )
 
     # Process the task
     result = await process_task(task_description, progress_callback=_progress_cb)
 
-    # Remove processing reaction
-    try:
-        await message.remove_reaction("\U0001f504", bot.user)
-    except discord.errors.NotFound:
-        pass
+    # Remove processing reaction alongside posting the result
+    clear_processing = _spawn(_unreact(message, _EMOJI_PROCESSING))
 
     # Handle result
     if result.status == "completed":
-        await message.add_reaction("\u2705")  # ✅
-        await _send_long_message(message.channel, result.response)
+        await asyncio.gather(
+            _react(message, _EMOJI_OK),
+            _send_long_message(message.channel, result.response),
+        )
 
     elif result.status == "checkpoint":
-        await message.add_reaction("\u23f8\ufe0f")  # ⏸️
+        await _react(message, _EMOJI_PAUSE)
 
         if result.conversation_history:
             # Planner checkpoint — show plan and wait for reaction approval
             plan_msg = (
                 f"**Plan ready** ({result.checkpoint_reason})\n\n"
                 f"{result.response}\n\n"
-                f"React \u2705 to approve or \u274c to cancel."
+                f"React {_EMOJI_OK} to approve or {_EMOJI_FAIL} to cancel."
             )
-            plan_message = await message.reply(plan_msg)
+            plan_message = await _reply(message, plan_msg)
 
-            # Add reactions for approval
-            await plan_message.add_reaction("\u2705")
-            await plan_message.add_reaction("\u274c")
+            # Add reactions for approval while fetching the task's actual budget
+            _, _, task = await asyncio.gather(
+                _react(plan_message, _EMOJI_OK),
+                _react(plan_message, _EMOJI_FAIL),
+                db.get_task(result.task_id),
+            )
 
             # Store checkpoint state
             _pending_checkpoints[plan_message.id] = {
                 "task_id": result.task_id,
-                "conversation_history": result.conversation_history,
-                "budget": float(result.response.split("$")[0]) if "$" in result.response else 1.0,
+                "budget": task["budget"] if task else DEFAULT_TASK_BUDGET,
                 "original_message": message,
+                "plan_message": plan_message,
                 "progress_cb": _progress_cb,
             }
-            # Retrieve actual budget from DB
-            task = await db.get_task(result.task_id)
-            if task:
-                _pending_checkpoints[plan_message.id]["budget"] = task["budget"]
 
         else:
             # Regular checkpoint (uncertainty)
             checkpoint_msg = (
                 f"**Checkpoint** ({result.checkpoint_reason})\n\n"
                 f"{result.response}\n\n"
-                f"Reply to continue, or react \u274c to cancel."
+                f"Reply to continue, or react {_EMOJI_FAIL} to cancel."
             )
-            await message.reply(checkpoint_msg)
+            await _reply(message, checkpoint_msg)
 
     elif result.status == "failed":
-        await message.add_reaction("\u274c")  # ❌
-        await message.reply(result.response)
-        await _send_to_channel(CHANNEL_ERRORS, f"Task `{result.task_id}` failed:\n{result.response}")
+        await asyncio.gather(
+            _react(message, _EMOJI_FAIL),
+            _reply(message, result.response),
+            _send_to_channel(CHANNEL_ERRORS, f"Task `{result.task_id}` failed:\n{result.response}"),
+        )
 
     elif result.status == "stalled":
-        await message.add_reaction("\u26a0\ufe0f")  # ⚠️
-        await message.reply(result.response)
+        await asyncio.gather(
+            _react(message, _EMOJI_WARN),
+            _reply(message, result.response),
+        )
+
+    await clear_processing
 
 
 @bot.event
-async def on_reaction_add(reaction: discord.Reaction, user: discord.User):
+async def on_raw_reaction_add(payload: discord.RawReactionActionEvent):
     """Handle reactions for planner checkpoint approval."""
-    if user == bot.user:
-        return
-
-    message_id = reaction.message.id
-    if message_id not in _pending_checkpoints:
+    # Raw event: reject irrelevant reactions before any message/cache lookup
+    message_id = payload.message_id
+    if message_id not in _pending_checkpoints or payload.user_id == bot.user.id:
         return
 
     checkpoint = _pending_checkpoints[message_id]
-    emoji = str(reaction.emoji)
+    emoji = payload.emoji.name
 
-    if emoji == "\u2705":
+    if emoji == _EMOJI_OK:
         # Approved — continue the planner
         del _pending_checkpoints[message_id]
 
         original = checkpoint["original_message"]
-        await original.add_reaction("\U0001f504")  # 🔄
+        await _react(original, _EMOJI_PROCESSING)
 
+        # The plan's conversation was saved with the checkpoint; the task id is enough
         result = await continue_task(
             task_id=checkpoint["task_id"],
-            conversation_history=checkpoint["conversation_history"],
             budget=checkpoint["budget"],
             progress_callback=checkpoint["progress_cb"],
         )
 
-        try:
-            await original.remove_reaction("\U0001f504", bot.user)
-        except discord.errors.NotFound:
-            pass
+        clear_processing = _spawn(_unreact(original, _EMOJI_PROCESSING))
 
         if result.status == "completed":
-            await original.add_reaction("\u2705")
-            await _send_long_message(original.channel, result.response)
+            await asyncio.gather(
+                _react(original, _EMOJI_OK),
+                _send_long_message(original.channel, result.response),
+            )
         elif result.status == "failed":
-            await original.add_reaction("\u274c")
-            await original.reply(result.response)
+            await asyncio.gather(_react(original, _EMOJI_FAIL), _reply(original, result.response))
         elif result.status == "stalled":
-            await original.add_reaction("\u26a0\ufe0f")
-            await original.reply(result.response)
+            await asyncio.gather(_react(original, _EMOJI_WARN), _reply(original, result.response))
+
+        await clear_processing
 
-    elif emoji == "\u274c":
+    elif emoji == _EMOJI_FAIL:
         # Rejected — cancel the task
         del _pending_checkpoints[message_id]
-        await db.update_task(checkpoint["task_id"], status="failed", error="User rejected plan")
-        await reaction.message.reply("Plan rejected. Task cancelled.")
+        await asyncio.gather(
+            db.update_task(checkpoint["task_id"], status="failed", error="User rejected plan"),
+            db.delete_task_messages(checkpoint["task_id"]),
+        )
+        await _reply(checkpoint["plan_message"], "Plan rejected. Task cancelled.")
 
 
 async def _send_long_message(channel, content: str):
     """Send a message, splitting into chunks if needed. Uses embeds for long content."""
     if not content:
-        await channel.send("Task completed (no text output).")
+        await _send(channel, "Task completed (no text output).")
         return
 
-    if len(content) <= 1990:
-        await channel.send(content)
+    if len(content) <= _CHUNK_SIZE:
+        await _send(channel, content)
     elif len(content) <= 4000:
         # Use an embed for medium-length content
         embed = discord.Embed(description=content[:4096], color=0x2ECC71)
-        await channel.send(embed=embed)
+        await _send(channel, embed=embed)
     else:
-        # Split into multiple messages
-        chunks = [content[i:i+1990] for i in range(0, len(content), 1990)]
-        for i, chunk in enumerate(chunks):
-            prefix = f"**[{i+1}/{len(chunks)}]**\n" if len(chunks) > 1 else ""
-            await channel.send(prefix + chunk)
+        # Split into multiple messages, one at a time so they arrive in order
+        # (dispatched calls overlap, so enqueuing them together could reorder)
+        n_chunks = (len(content) + _CHUNK_SIZE - 1) // _CHUNK_SIZE
+        for i, chunk in enumerate(_iter_chunks(content)):
+            await _send(channel, f"**[{i+1}/{n_chunks}]**\n{chunk}" if n_chunks > 1 else chunk)
 
 
 # === Commands ===
 
+async def _send_lines(channel, lines: Iterable[str]):
+    """Send lines in as few messages as fit, without splitting a line across messages."""
+    buf = io.StringIO()
+    for line in lines:
+        if buf.tell() and buf.tell() + len(line) + 1 > _CHUNK_SIZE:
+            await _send(channel, buf.getvalue())
+            buf = io.StringIO()
+        elif buf.tell():
+            buf.write("\n")
+        buf.write(line[:_CHUNK_SIZE])
+    if buf.tell():
+        await _send(channel, buf.getvalue())
+
+
 @bot.command(name="status")
 async def cmd_status(ctx):
     """Show bot status, task queue, and budget."""
     status = await get_status()
-    await ctx.send(status)
+    await _send(ctx.channel, status)
 
 
 @bot.command(name="cost")
 async def cmd_cost(ctx):
     """Show cost breakdown."""
-    daily = await db.get_daily_cost()
-    monthly = await db.get_monthly_cost()
-
-    # Show active task budgets
-    active = await db.get_active_tasks()
-    lines = [
-        f"**Cost Report**",
-        f"Today: ${daily:.4f}",
-        f"This month: ${monthly:.4f}",
-    ]
-    root_tasks = [t for t in active if not t.get("parent_task_id")]
-    if root_tasks:
-        lines.append("\n**Active task budgets:**")
-        for t in root_tasks:
-            lines.append(f"`{t['id']}` ${t['token_cost']:.4f} / ${t['budget']:.2f} — {t['description'][:50]}")
-
-    await ctx.send("\n".join(lines))
+    # Daily/monthly totals plus active task budgets
+    (daily, monthly), root_tasks = await asyncio.gather(
+        db.get_cost_snapshot(), db.get_root_active_tasks(),
+    )
+    def _lines():
+        yield "**Cost Report**"
+        yield f"Today: ${daily:.4f}"
+        yield f"This month: ${monthly:.4f}"
+        if root_tasks:
+            yield "\n**Active task budgets:**"
+            for t in root_tasks:
+                yield f"`{t['id']}` ${t['token_cost']:.4f} / ${t['budget']:.2f} — {t['description'][:50]}"
+
+    await _send_lines(ctx.channel, _lines())
 
 
 @bot.command(name="tasks")
@@ -292,32 +568,30 @@ async def cmd_tasks(ctx):
     """Show active tasks with tree structure."""
     active = await db.get_active_tasks()
     if not active:
-        await ctx.send("No active tasks.")
+        await _send(ctx.channel, "No active tasks.")
         return
 
     # Build tree view
-    lines = ["**Active Tasks**"]
-    for t in active:
-        depth = t.get("depth", 0)
-        indent = "  " * depth
-        budget_str = f"${t.get('budget', 0):.2f}" if depth == 0 else f"${t.get('token_cost', 0):.4f}"
-        status = t["status"]
-        desc = t["description"][:60]
-        lines.append(f"{indent}`{t['id']}` [{status}] {budget_str} {desc}")
+    def _lines():
+        yield "**Active Tasks**"
+        for t in active:
+            depth = t.get("depth", 0)
+            indent = "  " * depth
+            budget_str = f"${t.get('budget', 0):.2f}" if depth == 0 else f"${t.get('token_cost', 0):.4f}"
+            status = t["status"]
+            desc = t["description"][:60]
+            yield f"{indent}`{t['id']}` [{status}] {budget_str} {desc}"
 
-    await ctx.send("\n".join(lines))
+    await _send_lines(ctx.channel, _lines())
 
 
 @bot.command(name="ping")
 async def cmd_ping(ctx):
     """Check bot latency."""
-    await ctx.send(f"Pong! Latency: {round(bot.latency * 1000)}ms")
+    await _send(ctx.channel, f"Pong! Latency: {round(bot.latency * 1000)}ms")
 
 
-@bot.command(name="help_bot")
-async def cmd_help_bot(ctx):
-    """Show help."""
-    help_text = """**Thesis Bot — Commands**
+_HELP_TEXT = """**Thesis Bot — Commands**
 
 **Just type naturally** in #commands or DMs to give tasks:
 > "Summarize chapter 3"
@@ -338,26 +612,37 @@ async def cmd_help_bot(ctx):
 `!sonnet <task>` — Force Sonnet model
 `!haiku <task>` — Force Haiku model
 """
-    embed = discord.Embed(description=help_text, color=0x3498DB)
-    await ctx.send(embed=embed)
+_HELP_EMBED = discord.Embed(description=_HELP_TEXT, color=0x3498DB)
+
+
+@bot.command(name="help_bot")
+async def cmd_help_bot(ctx):
+    """Show help."""
+    await _send(ctx.channel, embed=_HELP_EMBED)
 
 
 # === Heartbeat ===
 
+async def _safe_log_heartbeat(queued: int, in_progress: int, daily: float):
+    try:
+        await db.log_heartbeat(queued, in_progress, daily)
+    except Exception as e:
+        print(f"Heartbeat log error: {e}")
+
+
 @tasks.loop(seconds=HEARTBEAT_INTERVAL_SECONDS)
 async def heartbeat_loop():
     """Periodic heartbeat to #status."""
     try:
-        active = await db.get_active_tasks()
-        daily = await db.get_daily_cost()
-        queued = sum(1 for t in active if t["status"] == "queued")
-        in_progress = sum(1 for t in active if t["status"] == "in_progress")
+        snap = await db.get_status_snapshot()
+        queued, in_progress, daily = snap["queued"], snap["in_progress"], snap["daily"]
 
-        await db.log_heartbeat(queued, in_progress, daily)
+        # Don't hold the visible heartbeat on the disk write
+        _spawn(_safe_log_heartbeat(queued, in_progress, daily))
 
         status_ch = _get_channel(CHANNEL_STATUS)
         if status_ch:
-            await status_ch.send(
+            await _send(status_ch,
                 f"🫀 Alive | Queue: {queued} | Active: {in_progress} | Today: ${daily:.4f}"
             )
     except Exception as e:
@@ -28,6 +28,9 @@ CHANNEL_SLURM = "slurm"
 MODEL_HAIKU = "claude-haiku-4-5-20251001"
 MODEL_SONNET = "claude-sonnet-4-5-20250929"
 MODEL_SONNET_LATEST = "claude-sonnet-4-6"   # for planning/decomposition
+ROUTER_CACHE_MAX = 512                # remembered routing decisions
+ROUTER_CACHE_TTL_SECONDS = 3600       # re-classify a repeated task after 1h
+HAIKU_ONLY_BUDGET = 0.05              # USD — below this a task can't afford one Sonnet call
 
 # === Token Budgets (per API call) ===
 MAX_INPUT_TOKENS = {
@@ -53,6 +56,10 @@ PRICING = {
     MODEL_SONNET_LATEST:  {"input": 3.00, "output": 15.00},
 }
 
+# Prompt caching: cache writes bill at 1.25x input, cache reads at 0.1x
+CACHE_WRITE_MULTIPLIER = 1.25
+CACHE_READ_MULTIPLIER = 0.10
+
 COST_LIMIT_DAILY = 20.00        # USD — safety net
 COST_LIMIT_MONTHLY = 100.00     # USD — hard stop
 
@@ -61,10 +68,13 @@ MAX_DELEGATION_DEPTH = 3              # 0=root, max nesting = 3
 MAX_SUBTASK_BUDGET = 1.00             # USD — max any single subtask can cost
 MIN_SUBTASK_BUDGET = 0.01             # USD — floor for subtask budget
 MAX_SUBTASKS_PER_TASK = 15            # prevent explosion
+PARALLEL_TOOL_FANOUT = True           # run a turn's delegations / read-only tools concurrently
 PLANNER_RESERVE_BUDGET = 0.10         # USD — planner reserves this for its own calls
 DEFAULT_TASK_BUDGET = 1.00            # USD — default when user doesn't specify $N
 MAX_TASK_BUDGET = 20.00               # USD — hard ceiling no user can exceed
 CONTEXT_FILE_MAX_LINES = 100          # lines read when injecting context files
+# Imported ahead of time by the spare run_python interpreter
+RUN_PYTHON_PREIMPORTS = ("numpy", "pandas", "scipy", "sklearn")
 
 # Per-depth step limits
 STEPS_BY_DEPTH = {0: 20, 1: 10, 2: 6, 3: 3}
@@ -72,6 +82,11 @@ STEPS_BY_DEPTH = {0: 20, 1: 10, 2: 6, 3: 3}
 # === Task Limits ===
 MAX_STEPS_PER_TASK = 10
 CHECKPOINT_STEP_RATIO = 0.7     # checkpoint at 70% of max steps
+HISTORY_COMPACT_CHARS = 24_000          # tool output kept in history before compacting
+HISTORY_KEEP_RECENT_STEPS = 2           # latest tool-result turns always kept verbatim
+STALE_TOOL_RESULT_CHARS = 200           # compacted tool results are cut to this
+PENDING_CHECKPOINTS_MAX = 256           # planner plans awaiting ✅/❌
+PENDING_CHECKPOINT_TTL_SECONDS = 86400  # unanswered plans expire after 24h
 
 # === Memory ===
 MAX_SESSION_MEMORIES_INJECTED = 2
@@ -80,12 +95,14 @@ SUMMARY_MAX_TOKENS = 200
 
 # === Heartbeat ===
 HEARTBEAT_INTERVAL_SECONDS = 300  # 5 minutes
+HEARTBEAT_FLUSH_ROWS = 12         # buffered heartbeat rows per DB write (~1 hour)
 
 # === Paths ===
 # Project root = wherever this file lives (i.e. the ClaudeBot repo)
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 
 DB_PATH = os.path.join(PROJECT_ROOT, "data", "bot.db")
+DB_READ_POOL_SIZE = 3  # read-only connections alongside the single writer
 LOG_DIR = os.path.join(PROJECT_ROOT, "data", "logs")
 
 # Thesis data directory — set in .env to point at your actual data
@@ -2,8 +2,18 @@
 Thesis Bot — Context Manager
 Assembles context for each API call from the three-tier memory system.
 """
+import asyncio
+import functools
+import itertools
 import json
 import os
+import re
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # optional speedup — stdlib json works fine
+    _json_loads = json.loads
 
 from config import (
     SYSTEM_PROMPT,
@@ -20,15 +30,22 @@ import db
 
 def _format_memory(mem: dict) -> str:
     """Format a memory row into a concise string."""
+    # Session memories saved since summary_fmt existed come pre-rendered
+    return mem.get("summary_fmt") or _format_cached(mem["id"], mem["summary"])
+
+
+@functools.lru_cache(maxsize=1024)
+def _format_cached(mem_id: str, summary_raw: str) -> str:
+    # Keyed on the raw summary too, so a rewritten memory can't hit a stale entry
     try:
-        summary = json.loads(mem["summary"])
+        summary = _json_loads(summary_raw)
         if isinstance(summary, dict):
             desc = summary.get("description", "")
             result = summary.get("result", "")
             return f"- {desc}: {result}"
         return f"- {summary}"
     except (json.JSONDecodeError, TypeError):
-        return f"- {mem.get('summary', '')}"
+        return f"- {summary_raw}"
 
 
 async def build_system_prompt(tools_description: str = "") -> str:
@@ -56,22 +73,31 @@ async def build_planner_prompt(tools_description: str, budget: float) -> str:
         memories = "\n".join(_format_memory(m) for m in recent)
         recent_text = f"\n\nRECENT WORK:\n{memories}"
 
-    prompt = PLANNER_SYSTEM_PROMPT.format(
-        tools=tools_description,
-        budget=f"{budget:.2f}",
-        reserve=f"{PLANNER_RESERVE_BUDGET:.2f}",
-    )
-    return prompt + recent_text
+    return _planner_prompt(tools_description, f"{budget:.2f}") + recent_text
 
 
 def build_worker_prompt(tools_description: str, budget: float) -> str:
     """Build the system prompt for a worker sub-agent (minimal, no memory)."""
-    return WORKER_SYSTEM_PROMPT.format(
+    return _worker_prompt(tools_description, f"{budget:.2f}")
+
+
+# The static prompt parts depend only on the (per-depth constant) tool
+# description and the budget rounded to cents, so cache the formatted text.
+
+@functools.lru_cache(maxsize=64)
+def _planner_prompt(tools_description: str, budget: str) -> str:
+    return PLANNER_SYSTEM_PROMPT.format(
         tools=tools_description,
-        budget=f"{budget:.2f}",
+        budget=budget,
+        reserve=f"{PLANNER_RESERVE_BUDGET:.2f}",
     )
 
 
+@functools.lru_cache(maxsize=64)
+def _worker_prompt(tools_description: str, budget: str) -> str:
+    return WORKER_SYSTEM_PROMPT.format(tools=tools_description, budget=budget)
+
+
 async def build_messages(
     task_description: str,
     conversation_history: list[dict] | None = None,
@@ -106,7 +132,19 @@ async def build_messages(
     return messages
 
 
-def build_subtask_messages(
+def _read_context_file(filepath: str) -> str:
+    """Return the '[path]:\n<head>' block for one context file (blocking)."""
+    resolved = filepath if os.path.isabs(filepath) else os.path.join(THESIS_DIR, filepath)
+    try:
+        # Only the head is ever used, so don't read the whole file
+        with open(resolved, "r", buffering=65536) as f:
+            content = "".join(itertools.islice(f, CONTEXT_FILE_MAX_LINES))
+        return f"[{filepath}]:\n{content}"
+    except (FileNotFoundError, UnicodeDecodeError, PermissionError):
+        return f"[{filepath}]: (could not read file)"
+
+
+async def build_subtask_messages(
     description: str,
     context_files: list[str] | None = None,
 ) -> list[dict]:
@@ -114,16 +152,10 @@ def build_subtask_messages(
     messages = []
 
     if context_files:
-        context_parts = []
-        for filepath in context_files[:3]:  # max 3 files
-            resolved = filepath if os.path.isabs(filepath) else os.path.join(THESIS_DIR, filepath)
-            try:
-                with open(resolved, "r") as f:
-                    lines = f.readlines()[:CONTEXT_FILE_MAX_LINES]
-                content = "".join(lines)
-                context_parts.append(f"[{filepath}]:\n{content}")
-            except (FileNotFoundError, UnicodeDecodeError, PermissionError):
-                context_parts.append(f"[{filepath}]: (could not read file)")
+        # Read files concurrently, off the event loop (max 3 files)
+        context_parts = await asyncio.gather(
+            *(asyncio.to_thread(_read_context_file, fp) for fp in context_files[:3])
+        )
 
         if context_parts:
             messages.append({"role": "user", "content": "Context files:\n\n" + "\n\n".join(context_parts)})
@@ -133,29 +165,27 @@ def build_subtask_messages(
     return messages
 
 
+# Common words skipped by extract_keywords
+_STOP_WORDS: frozenset[str] = frozenset({
+    "the", "a", "an", "is", "are", "was", "were", "be", "been", "being",
+    "have", "has", "had", "do", "does", "did", "will", "would", "could",
+    "should", "may", "might", "can", "shall", "to", "of", "in", "for",
+    "on", "with", "at", "by", "from", "as", "into", "about", "between",
+    "through", "after", "before", "during", "without", "it", "its",
+    "this", "that", "these", "those", "i", "you", "he", "she", "we",
+    "they", "my", "your", "his", "her", "our", "their", "me", "him",
+    "and", "or", "but", "not", "so", "if", "then", "than", "also",
+    "just", "please", "help", "want", "need", "make", "get", "run",
+})
+# Words of 3+ letters/digits starting with a letter, in any script (so
+# "løsning" and "résumé" stay whole); input is lowercased
+_TOKEN_RE = re.compile(r"[^\W\d_][^\W_]{2,}")
+
+
 def extract_keywords(text: str) -> list[str]:
     """Extract simple keywords from text for memory search."""
-    # Basic keyword extraction — skip common words
-    stop_words = {
-        "the", "a", "an", "is", "are", "was", "were", "be", "been", "being",
-        "have", "has", "had", "do", "does", "did", "will", "would", "could",
-        "should", "may", "might", "can", "shall", "to", "of", "in", "for",
-        "on", "with", "at", "by", "from", "as", "into", "about", "between",
-        "through", "after", "before", "during", "without", "it", "its",
-        "this", "that", "these", "those", "i", "you", "he", "she", "we",
-        "they", "my", "your", "his", "her", "our", "their", "me", "him",
-        "and", "or", "but", "not", "so", "if", "then", "than", "also",
-        "just", "please", "help", "want", "need", "make", "get", "run",
-    }
-    words = text.lower().split()
-    keywords = [w.strip(".,!?;:'\"()[]{}") for w in words if len(w) > 2 and w.lower() not in stop_words]
-    # Return unique keywords, max 5
-    seen = set()
-    result = []
-    for kw in keywords:
-        if kw not in seen:
-            seen.add(kw)
-            result.append(kw)
-        if len(result) >= 5:
-            break
-    return result
+    if len(text) < 3:  # shorter than any token _TOKEN_RE can match
+        return []
+    keywords = (kw for kw in _TOKEN_RE.findall(text.lower()) if kw not in _STOP_WORDS)
+    # Return unique keywords in first-seen order, max 5
+    return list(dict.fromkeys(keywords))[:5]
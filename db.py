@@ -3,94 +3,274 @@ Thesis Bot — Database
 SQLite for task state, session memory, long-term memory, and cost tracking.
 """
 import aiosqlite
+import asyncio
+import contextlib
 import json
 import os
-from datetime import datetime, timezone
-
-from config import DB_PATH, DEFAULT_TASK_BUDGET
+import time
+from datetime import datetime, timedelta, timezone
+
+try:
+    import orjson
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()
+    _json_loads = orjson.loads
+except ImportError:  # optional speedup — stdlib json works fine
+    _json_dumps = json.dumps
+    _json_loads = json.loads
+
+from config import DB_PATH, DB_READ_POOL_SIZE, DEFAULT_TASK_BUDGET, HEARTBEAT_FLUSH_ROWS
+
+# One long-lived connection for every write (opened lazily)
+_DB: aiosqlite.Connection | None = None
+
+
+async def _conn() -> aiosqlite.Connection:
+    global _DB
+    if _DB is None:
+        _DB = await aiosqlite.connect(DB_PATH)
+        _DB.row_factory = aiosqlite.Row
+        # WAL: readers don't block the writer, and NORMAL sync skips the
+        # per-commit fsync (still safe against app crashes in WAL mode)
+        await _DB.executescript("""
+            PRAGMA journal_mode=WAL;
+            PRAGMA synchronous=NORMAL;
+            PRAGMA temp_store=MEMORY;
+            PRAGMA mmap_size=268435456;
+            PRAGMA cache_size=-64000;
+            PRAGMA busy_timeout=5000;
+        """)
+    return _DB
+
+
+# Read-only connections for the getters. In WAL mode they read the last
+# committed state without queueing behind the writer's aiosqlite thread, so
+# status/heartbeat/cost reads don't stall on the agent loop's writes.
+_READ_POOL: asyncio.Queue | None = None
+_readers: list[aiosqlite.Connection] = []
+_readers_opening = 0
+
+
+async def _open_reader() -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(f"file:{DB_PATH}?mode=ro", uri=True)
+    conn.row_factory = aiosqlite.Row
+    await conn.executescript("""
+        PRAGMA query_only=1;
+        PRAGMA temp_store=MEMORY;
+        PRAGMA mmap_size=268435456;
+        PRAGMA cache_size=-16000;
+        PRAGMA busy_timeout=5000;
+    """)
+    return conn
+
+
+@contextlib.asynccontextmanager
+async def _reader():
+    """Borrow a pooled read-only connection (opened lazily, up to DB_READ_POOL_SIZE)."""
+    global _READ_POOL, _readers_opening
+    if _READ_POOL is None:
+        _READ_POOL = asyncio.Queue()
+    if _READ_POOL.empty() and len(_readers) + _readers_opening < DB_READ_POOL_SIZE:
+        _readers_opening += 1
+        try:
+            conn = await _open_reader()
+        finally:
+            _readers_opening -= 1
+        _readers.append(conn)
+    else:
+        conn = await _READ_POOL.get()
+    try:
+        yield conn
+    finally:
+        _READ_POOL.put_nowait(conn)
+
+
+async def close_db():
+    """Close the shared writer and any pooled readers (on shutdown)."""
+    global _DB, _READ_POOL
+    for conn in _readers:
+        await conn.close()
+    _readers.clear()
+    _READ_POOL = None
+    if _DB is not None:
+        await flush_heartbeats()
+        await _DB.close()
+        _DB = None
+
+
+_SCHEMA_VERSION = 1
+
+
+async def _migrate(db: aiosqlite.Connection):
+    """Bring a DB created by an older version up to the current schema."""
+    # Backfill the FTS index for memories written before it existed
+    await db.executescript("""
+        INSERT INTO memory_fts (id, tags)
+            SELECT id, tags FROM memory_session WHERE id NOT IN (SELECT id FROM memory_fts);
+        INSERT INTO memory_fts (id, tags)
+            SELECT id, tags FROM memory_long_term WHERE id NOT IN (SELECT id FROM memory_fts);
+    """)
+
+    # Add columns missing from older tasks/memory_session tables
+    for col, default in [
+        ("parent_task_id", "NULL"),
+        ("depth", "0"),
+        ("budget", str(DEFAULT_TASK_BUDGET)),
+    ]:
+        try:
+            await db.execute(f"ALTER TABLE tasks ADD COLUMN {col} {'TEXT' if col == 'parent_task_id' else 'REAL' if col == 'budget' else 'INTEGER'} DEFAULT {default}")
+        except Exception:
+            pass  # column already exists
+
+    try:
+        await db.execute("ALTER TABLE memory_session ADD COLUMN summary_fmt TEXT")
+    except Exception:
+        pass  # column already exists
 
 
 async def init_db():
     """Create tables if they don't exist, and migrate schema."""
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.executescript("""
-            CREATE TABLE IF NOT EXISTS tasks (
-                id          TEXT PRIMARY KEY,
-                created_at  TEXT NOT NULL,
-                updated_at  TEXT NOT NULL,
-                status      TEXT NOT NULL DEFAULT 'queued',
-                description TEXT NOT NULL,
-                model       TEXT,
-                step_count  INTEGER DEFAULT 0,
-                max_steps   INTEGER DEFAULT 10,
-                token_cost  REAL DEFAULT 0.0,
-                input_tokens  INTEGER DEFAULT 0,
-                output_tokens INTEGER DEFAULT 0,
-                result      TEXT,
-                error       TEXT,
-                discord_message_id TEXT,
-                discord_channel_id TEXT,
-                parent_task_id TEXT,
-                depth       INTEGER DEFAULT 0,
-                budget      REAL DEFAULT 1.0
-            );
-
-            CREATE TABLE IF NOT EXISTS memory_session (
-                id          TEXT PRIMARY KEY,
-                task_id     TEXT NOT NULL,
-                summary     TEXT NOT NULL,
-                tags        TEXT,
-                created_at  TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS memory_long_term (
-                id          TEXT PRIMARY KEY,
-                session_date TEXT NOT NULL,
-                summary     TEXT NOT NULL,
-                tags        TEXT,
-                created_at  TEXT NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS cost_log (
-                id          INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp   TEXT NOT NULL,
-                task_id     TEXT,
-                model       TEXT NOT NULL,
-                input_tokens  INTEGER NOT NULL,
-                output_tokens INTEGER NOT NULL,
-                cost_usd    REAL NOT NULL
-            );
-
-            CREATE TABLE IF NOT EXISTS heartbeats (
-                id          INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp   TEXT NOT NULL,
-                tasks_queued    INTEGER,
-                tasks_active    INTEGER,
-                budget_used_today REAL
-            );
-        """)
-
-        # Migrate existing DBs: add new columns if missing
-        for col, default in [
-            ("parent_task_id", "NULL"),
-            ("depth", "0"),
-            ("budget", str(DEFAULT_TASK_BUDGET)),
-        ]:
-            try:
-                await db.execute(f"ALTER TABLE tasks ADD COLUMN {col} {'TEXT' if col == 'parent_task_id' else 'REAL' if col == 'budget' else 'INTEGER'} DEFAULT {default}")
-            except Exception:
-                pass  # column already exists
-
-        await db.commit()
+    db = await _conn()
+    await db.executescript("""
+        CREATE TABLE IF NOT EXISTS tasks (
+            id          TEXT PRIMARY KEY,
+            created_at  TEXT NOT NULL,
+            updated_at  TEXT NOT NULL,
+            status      TEXT NOT NULL DEFAULT 'queued',
+            description TEXT NOT NULL,
+            model       TEXT,
+            step_count  INTEGER DEFAULT 0,
+            max_steps   INTEGER DEFAULT 10,
+            token_cost  REAL DEFAULT 0.0,
+            input_tokens  INTEGER DEFAULT 0,
+            output_tokens INTEGER DEFAULT 0,
+            result      TEXT,
+            error       TEXT,
+            discord_message_id TEXT,
+            discord_channel_id TEXT,
+            parent_task_id TEXT,
+            depth       INTEGER DEFAULT 0,
+            budget      REAL DEFAULT 1.0
+        );
+
+        CREATE TABLE IF NOT EXISTS memory_session (
+            id          TEXT PRIMARY KEY,
+            task_id     TEXT NOT NULL,
+            summary     TEXT NOT NULL,
+            summary_fmt TEXT,
+            tags        TEXT,
+            created_at  TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS memory_long_term (
+            id          TEXT PRIMARY KEY,
+            session_date TEXT NOT NULL,
+            summary     TEXT NOT NULL,
+            tags        TEXT,
+            created_at  TEXT NOT NULL
+        );
+
+        CREATE TABLE IF NOT EXISTS cost_log (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp   TEXT NOT NULL,
+            task_id     TEXT,
+            model       TEXT NOT NULL,
+            input_tokens  INTEGER NOT NULL,
+            output_tokens INTEGER NOT NULL,
+            cost_usd    REAL NOT NULL
+        );
+
+        -- Append-only conversation log, so a paused task can be resumed
+        -- from the DB instead of holding its history in memory
+        CREATE TABLE IF NOT EXISTS task_messages (
+            task_id     TEXT NOT NULL,
+            seq         INTEGER NOT NULL,
+            role        TEXT NOT NULL,
+            content     TEXT NOT NULL,
+            PRIMARY KEY (task_id, seq)
+        ) WITHOUT ROWID;
+
+        CREATE TABLE IF NOT EXISTS heartbeats (
+            id          INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp   TEXT NOT NULL,
+            tasks_queued    INTEGER,
+            tasks_active    INTEGER,
+            budget_used_today REAL
+        );
+
+        CREATE INDEX IF NOT EXISTS idx_cost_ts ON cost_log(timestamp);
+        CREATE INDEX IF NOT EXISTS idx_mlong_created ON memory_long_term(created_at DESC);
+
+        -- Full-text index over memory tags (both tables), kept in sync by
+        -- triggers. INSERT OR REPLACE doesn't fire delete triggers, so the
+        -- insert triggers clear any stale row first.
+        CREATE VIRTUAL TABLE IF NOT EXISTS memory_fts USING fts5(id UNINDEXED, tags);
+
+        CREATE TRIGGER IF NOT EXISTS trg_msession_fts_ins AFTER INSERT ON memory_session
+        BEGIN
+            DELETE FROM memory_fts WHERE id = NEW.id;
+            INSERT INTO memory_fts (id, tags) VALUES (NEW.id, NEW.tags);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_msession_fts_del AFTER DELETE ON memory_session
+        BEGIN
+            DELETE FROM memory_fts WHERE id = OLD.id;
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_mlong_fts_ins AFTER INSERT ON memory_long_term
+        BEGIN
+            DELETE FROM memory_fts WHERE id = NEW.id;
+            INSERT INTO memory_fts (id, tags) VALUES (NEW.id, NEW.tags);
+        END;
+        CREATE TRIGGER IF NOT EXISTS trg_mlong_fts_del AFTER DELETE ON memory_long_term
+        BEGIN
+            DELETE FROM memory_fts WHERE id = OLD.id;
+        END;
+
+        -- Keep each task's running totals in step with cost_log, atomically
+        -- and without a second statement per logged call
+        CREATE TRIGGER IF NOT EXISTS trg_cost_log_task_totals
+        AFTER INSERT ON cost_log
+        BEGIN
+            UPDATE tasks SET
+                token_cost = token_cost + NEW.cost_usd,
+                input_tokens = input_tokens + NEW.input_tokens,
+                output_tokens = output_tokens + NEW.output_tokens
+            WHERE id = NEW.task_id;
+        END;
+    """)
+
+    # Migrations run once per DB: user_version records that they're done, so
+    # steady-state startups do no failed ALTERs. Every step is idempotent;
+    # bump _SCHEMA_VERSION when adding one.
+    cursor = await db.execute("PRAGMA user_version")
+    (version,) = await cursor.fetchone()
+    if version < _SCHEMA_VERSION:
+        await _migrate(db)
+        await db.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    # Indexes on migrated columns have to come after the migration
+    await db.executescript("""
+        -- Covering index: recent-memory lookups never touch the table
+        CREATE INDEX IF NOT EXISTS idx_msession_recent_fmt
+            ON memory_session(created_at DESC, id, summary_fmt, summary);
+        -- Status filters (active/stale/counts) and subtask lookups, in created_at order
+        CREATE INDEX IF NOT EXISTS idx_tasks_status ON tasks(status, created_at);
+        CREATE INDEX IF NOT EXISTS idx_tasks_parent ON tasks(parent_task_id, created_at);
+    """)
+
+    await db.commit()
+
+
+_UTC = timezone.utc
 
 
 def _now() -> str:
-    return datetime.now(timezone.utc).isoformat()
+    return datetime.now(_UTC).isoformat()
 
 
 def _generate_task_id() -> str:
-    now = datetime.now(timezone.utc)
+    now = datetime.now(_UTC)
     return f"t_{now.strftime('%Y%m%d_%H%M%S')}_{now.strftime('%f')[:4]}"
 
 
@@ -104,10 +284,11 @@ async def create_task(
     parent_task_id: str | None = None,
 ) -> dict:
     """Create a new task and return it."""
+    now = _now()
     task = {
         "id": _generate_task_id(),
-        "created_at": _now(),
-        "updated_at": _now(),
+        "created_at": now,
+        "updated_at": now,
         "status": "queued",
         "description": description,
         "model": None,
@@ -122,15 +303,15 @@ async def create_task(
         "depth": depth,
         "budget": budget,
     }
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """INSERT INTO tasks (id, created_at, updated_at, status, description,
-               max_steps, parent_task_id, depth, budget)
-               VALUES (:id, :created_at, :updated_at, :status, :description,
-               :max_steps, :parent_task_id, :depth, :budget)""",
-            task,
-        )
-        await db.commit()
+    db = await _conn()
+    await db.execute(
+        """INSERT INTO tasks (id, created_at, updated_at, status, description,
+           max_steps, parent_task_id, depth, budget)
+           VALUES (:id, :created_at, :updated_at, :status, :description,
+           :max_steps, :parent_task_id, :depth, :budget)""",
+        task,
+    )
+    await db.commit()
     return task
 
 
@@ -151,50 +332,95 @@ async def create_subtask(
     )
 
 
+# UPDATE statement per set of fields. Identical SQL text also lets sqlite3's
+# statement cache reuse the prepared statement whatever the kwarg order.
+_UPDATE_SQL_CACHE: dict[frozenset[str], str] = {}
+
+
 async def update_task(task_id: str, **kwargs):
     """Update task fields."""
     kwargs["updated_at"] = _now()
-    set_clause = ", ".join(f"{k} = :{k}" for k in kwargs)
+    key = frozenset(kwargs)
+    sql = _UPDATE_SQL_CACHE.get(key)
+    if sql is None:
+        set_clause = ", ".join(f"{k} = :{k}" for k in sorted(key))
+        sql = _UPDATE_SQL_CACHE[key] = f"UPDATE tasks SET {set_clause} WHERE id = :task_id"
     kwargs["task_id"] = task_id
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            f"UPDATE tasks SET {set_clause} WHERE id = :task_id",
-            kwargs,
-        )
-        await db.commit()
+    db = await _conn()
+    await db.execute(sql, kwargs)
+    await db.commit()
+
+
+async def tick_step(task_id: str, step: int) -> tuple[float, float] | None:
+    """Record the step count and return (task token_cost, today's total cost) in one round-trip.
+
+    None if the task doesn't exist.
+    """
+    day_start, day_end = _day_range(datetime.now(_UTC))
+    db = await _conn()
+    cursor = await db.execute(
+        """UPDATE tasks SET step_count = ?, updated_at = ? WHERE id = ?
+           RETURNING token_cost,
+               (SELECT COALESCE(SUM(cost_usd), 0) FROM cost_log
+                WHERE timestamp >= ? AND timestamp < ?)""",
+        (step, _now(), task_id, day_start, day_end),
+    )
+    row = await cursor.fetchone()
+    await db.commit()
+    return (row[0], row[1]) if row else None
 
 
 async def get_task(task_id: str) -> dict | None:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
         cursor = await db.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
         row = await cursor.fetchone()
         return dict(row) if row else None
 
 
+async def get_task_cost(task_id: str) -> float:
+    """Just a task's token_cost (0.0 if it doesn't exist), for budget checks."""
+    async with _reader() as db:
+        cursor = await db.execute("SELECT token_cost FROM tasks WHERE id = ?", (task_id,))
+        row = await cursor.fetchone()
+        return row[0] if row else 0.0
+
+
 async def get_active_tasks() -> list[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Active tasks as {id, status, description, depth, budget, token_cost} (what !tasks shows)."""
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT * FROM tasks WHERE status IN ('queued', 'in_progress', 'classifying', 'checkpoint') ORDER BY created_at"
+            "SELECT id, status, description, depth, budget, token_cost FROM tasks "
+            "WHERE status IN ('queued', 'in_progress', 'classifying', 'checkpoint') ORDER BY created_at"
         )
         return [dict(row) for row in await cursor.fetchall()]
 
 
-async def get_stale_tasks() -> list[dict]:
-    """Find tasks stuck in 'in_progress' (for crash recovery)."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+async def get_root_active_tasks() -> list[dict]:
+    """Active tasks with no parent (user-submitted roots), as {id, description, budget, token_cost}."""
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT * FROM tasks WHERE status = 'in_progress'"
+            "SELECT id, description, budget, token_cost FROM tasks WHERE parent_task_id IS NULL "
+            "AND status IN ('queued', 'in_progress', 'classifying', 'checkpoint') ORDER BY created_at"
         )
         return [dict(row) for row in await cursor.fetchall()]
 
 
+async def fail_stale_tasks(error: str) -> list[tuple[str, str]]:
+    """Mark tasks stuck in 'in_progress' as failed (crash recovery); returns their (id, description)."""
+    db = await _conn()
+    cursor = await db.execute(
+        "UPDATE tasks SET status = 'failed', error = ?, updated_at = ? "
+        "WHERE status = 'in_progress' RETURNING id, description",
+        (error, _now()),
+    )
+    stale = [tuple(row) for row in await cursor.fetchall()]
+    await db.commit()
+    return stale
+
+
 async def get_subtasks(parent_task_id: str) -> list[dict]:
     """Get all direct subtasks of a parent task."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
         cursor = await db.execute(
             "SELECT * FROM tasks WHERE parent_task_id = ? ORDER BY created_at",
             (parent_task_id,),
@@ -204,7 +430,7 @@ async def get_subtasks(parent_task_id: str) -> list[dict]:
 
 async def get_subtask_count(parent_task_id: str) -> int:
     """Count direct subtasks of a parent task."""
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with _reader() as db:
         cursor = await db.execute(
             "SELECT COUNT(*) FROM tasks WHERE parent_task_id = ?",
             (parent_task_id,),
@@ -214,30 +440,27 @@ async def get_subtask_count(parent_task_id: str) -> int:
 
 
 async def cascade_cost_to_parent(child_task_id: str, cost: float):
-    """Walk up the parent chain adding cost to each ancestor."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        current_id = child_task_id
-        while True:
-            cursor = await db.execute(
-                "SELECT parent_task_id FROM tasks WHERE id = ?", (current_id,)
-            )
-            row = await cursor.fetchone()
-            if not row or not row["parent_task_id"]:
-                break
-            parent_id = row["parent_task_id"]
-            await db.execute(
-                "UPDATE tasks SET token_cost = token_cost + ?, updated_at = ? WHERE id = ?",
-                (cost, _now(), parent_id),
-            )
-            current_id = parent_id
-        await db.commit()
+    """Add cost to every ancestor of a task (one recursive UPDATE)."""
+    db = await _conn()
+    await db.execute(
+        """
+        WITH RECURSIVE ancestors(id) AS (
+            SELECT parent_task_id FROM tasks WHERE id = ?
+            UNION ALL
+            SELECT t.parent_task_id FROM tasks t
+            JOIN ancestors a ON t.id = a.id
+        )
+        UPDATE tasks SET token_cost = token_cost + ?, updated_at = ?
+        WHERE id IN (SELECT id FROM ancestors WHERE id IS NOT NULL)
+        """,
+        (child_task_id, cost, _now()),
+    )
+    await db.commit()
 
 
 async def get_task_tree(root_task_id: str) -> list[dict]:
     """Return all descendants of a root task ordered by depth then created_at."""
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    async with _reader() as db:
         # Recursive CTE to get all descendants
         cursor = await db.execute(
             """
@@ -259,94 +482,194 @@ async def get_task_tree(root_task_id: str) -> list[dict]:
 # === Cost Tracking ===
 
 async def log_cost(task_id: str, model: str, input_tokens: int, output_tokens: int, cost_usd: float):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """INSERT INTO cost_log (timestamp, task_id, model, input_tokens, output_tokens, cost_usd)
-               VALUES (?, ?, ?, ?, ?, ?)""",
-            (_now(), task_id, model, input_tokens, output_tokens, cost_usd),
-        )
-        # Also update the task's running total
-        await db.execute(
-            """UPDATE tasks SET
-                token_cost = token_cost + ?,
-                input_tokens = input_tokens + ?,
-                output_tokens = output_tokens + ?
-               WHERE id = ?""",
-            (cost_usd, input_tokens, output_tokens, task_id),
-        )
-        await db.commit()
+    """Log one API call; the trg_cost_log_task_totals trigger updates the task's running total."""
+    db = await _conn()
+    await db.execute(
+        """INSERT INTO cost_log (timestamp, task_id, model, input_tokens, output_tokens, cost_usd)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (_now(), task_id, model, input_tokens, output_tokens, cost_usd),
+    )
+    await db.commit()
+    # Budget checks read the snapshot right after spending, so never serve a stale one
+    global _cost_cache
+    _cost_cache = None
 
 
-async def get_daily_cost() -> float:
-    today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
-    async with aiosqlite.connect(DB_PATH) as db:
+def _day_range(now: datetime) -> tuple[str, str]:
+    """[start, end) ISO bounds of now's UTC day, for index range scans on timestamp."""
+    start = now.date()
+    return start.isoformat(), (start + timedelta(days=1)).isoformat()
+
+
+def _month_range(now: datetime) -> tuple[str, str]:
+    """[start, end) ISO bounds of now's UTC month."""
+    start = now.date().replace(day=1)
+    end = (start + timedelta(days=32)).replace(day=1)
+    return start.isoformat(), end.isoformat()
+
+
+# (monotonic time, (daily, monthly)) — budget displays don't need sub-second freshness
+_cost_cache: tuple[float, tuple[float, float]] | None = None
+_COST_CACHE_TTL = 1.0
+
+
+async def get_cost_snapshot() -> tuple[float, float]:
+    """(daily, monthly) spend in one cost_log range scan, cached for _COST_CACHE_TTL."""
+    global _cost_cache
+    if _cost_cache and time.monotonic() - _cost_cache[0] < _COST_CACHE_TTL:
+        return _cost_cache[1]
+    now = datetime.now(_UTC)
+    day_start, day_end = _day_range(now)
+    month_start, month_end = _month_range(now)
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT COALESCE(SUM(cost_usd), 0) FROM cost_log WHERE timestamp LIKE ?",
-            (f"{today}%",),
+            """SELECT COALESCE(SUM(CASE WHEN timestamp >= ? THEN cost_usd ELSE 0 END), 0),
+                      COALESCE(SUM(cost_usd), 0)
+               FROM cost_log WHERE timestamp >= ? AND timestamp < ?""",
+            (day_start, month_start, month_end),
         )
         row = await cursor.fetchone()
-        return row[0]
+        snapshot = (row[0], row[1])
+        _cost_cache = (time.monotonic(), snapshot)
+        return snapshot
+
+
+async def get_status_snapshot() -> dict:
+    """Queued/in-progress counts plus daily/monthly spend, all in one query."""
+    global _cost_cache
+    now = datetime.now(_UTC)
+    day_start, _ = _day_range(now)
+    month_start, month_end = _month_range(now)
+    async with _reader() as db:
+        cursor = await db.execute(
+            """SELECT
+                   (SELECT COUNT(*) FROM tasks WHERE status = 'queued'),
+                   (SELECT COUNT(*) FROM tasks WHERE status = 'in_progress'),
+                   COALESCE(SUM(CASE WHEN timestamp >= ? THEN cost_usd ELSE 0 END), 0),
+                   COALESCE(SUM(cost_usd), 0)
+               FROM cost_log WHERE timestamp >= ? AND timestamp < ?""",
+            (day_start, month_start, month_end),
+        )
+        queued, in_progress, daily, monthly = await cursor.fetchone()
+        _cost_cache = (time.monotonic(), (daily, monthly))
+        return {"queued": queued, "in_progress": in_progress, "daily": daily, "monthly": monthly}
+
+
+async def get_daily_cost() -> float:
+    return (await get_cost_snapshot())[0]
 
 
 async def get_monthly_cost() -> float:
-    month = datetime.now(timezone.utc).strftime("%Y-%m")
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute(
-            "SELECT COALESCE(SUM(cost_usd), 0) FROM cost_log WHERE timestamp LIKE ?",
-            (f"{month}%",),
-        )
-        row = await cursor.fetchone()
-        return row[0]
+    return (await get_cost_snapshot())[1]
 
 
 # === Memory Operations ===
 
 async def save_session_memory(task_id: str, summary: dict, tags: list[str]):
     mem_id = f"sm_{task_id}"
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """INSERT OR REPLACE INTO memory_session (id, task_id, summary, tags, created_at)
-               VALUES (?, ?, ?, ?, ?)""",
-            (mem_id, task_id, json.dumps(summary), ",".join(tags), _now()),
-        )
-        await db.commit()
+    # Store the prompt bullet pre-rendered so prompt builds needn't parse JSON
+    summary_fmt = f"- {summary.get('description', '')}: {summary.get('result', '')}"
+    db = await _conn()
+    await db.execute(
+        """INSERT OR REPLACE INTO memory_session (id, task_id, summary, summary_fmt, tags, created_at)
+           VALUES (?, ?, ?, ?, ?, ?)""",
+        (mem_id, task_id, _json_dumps(summary), summary_fmt, ",".join(tags), _now()),
+    )
+    await db.commit()
 
 
 async def get_recent_session_memories(limit: int = 2) -> list[dict]:
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
+    """Most recent session memories, as {id, summary, summary_fmt} only (all prompt building needs)."""
+    async with _reader() as db:
         cursor = await db.execute(
-            "SELECT * FROM memory_session ORDER BY created_at DESC LIMIT ?",
+            "SELECT id, summary, summary_fmt FROM memory_session ORDER BY created_at DESC LIMIT ?",
             (limit,),
         )
         rows = await cursor.fetchall()
         return [dict(row) for row in rows]
 
 
+def _fts_query(keywords: list[str]) -> str:
+    """OR together keywords as quoted prefix terms, e.g. '"fft"* OR "signal"*'."""
+    return " OR ".join('"{}"*'.format(kw.replace('"', '""')) for kw in keywords)
+
+
 async def search_memories(keywords: list[str], limit: int = 3) -> list[dict]:
-    """Search session and long-term memories by tags."""
-    conditions = " OR ".join(["tags LIKE ?" for _ in keywords])
-    params = [f"%{kw}%" for kw in keywords]
-
-    results = []
-    async with aiosqlite.connect(DB_PATH) as db:
-        db.row_factory = aiosqlite.Row
-        for table in ("memory_session", "memory_long_term"):
-            cursor = await db.execute(
-                f"SELECT * FROM {table} WHERE {conditions} ORDER BY created_at DESC LIMIT ?",
-                params + [limit],
-            )
-            results.extend([dict(row) for row in await cursor.fetchall()])
-    return results[:limit]
+    """Search session and long-term memories by tags (session matches first, then best bm25 match)."""
+    if not keywords:
+        return []
+    async with _reader() as db:
+        cursor = await db.execute(
+            """WITH hits(id, score) AS (SELECT id, bm25(memory_fts) FROM memory_fts WHERE memory_fts MATCH ?)
+               SELECT id, summary, summary_fmt, tags, created_at FROM (
+                   SELECT 0 AS src, m.id, m.summary, m.summary_fmt, m.tags, m.created_at, h.score
+                   FROM hits h JOIN memory_session m ON m.id = h.id
+                   UNION ALL
+                   SELECT 1 AS src, m.id, m.summary, NULL, m.tags, m.created_at, h.score
+                   FROM hits h JOIN memory_long_term m ON m.id = h.id
+               )
+               ORDER BY src, score, created_at DESC LIMIT ?""",
+            (_fts_query(keywords), limit),
+        )
+        return [dict(row) for row in await cursor.fetchall()]
+
+
+# === Conversation Checkpoints ===
+
+async def save_task_messages(task_id: str, messages: list[dict]):
+    """Append the messages not yet stored for a task (earlier turns never change).
+
+    messages must be JSON-serializable: content is a string or a list of dict blocks.
+    """
+    db = await _conn()
+    cursor = await db.execute("SELECT COUNT(*) FROM task_messages WHERE task_id = ?", (task_id,))
+    (stored,) = await cursor.fetchone()
+    await db.executemany(
+        "INSERT INTO task_messages (task_id, seq, role, content) VALUES (?, ?, ?, ?)",
+        [(task_id, seq, m["role"], _json_dumps(m["content"])) for seq, m in enumerate(messages[stored:], stored)],
+    )
+    await db.commit()
+
+
+async def get_task_messages(task_id: str) -> list[dict]:
+    """A task's stored conversation, in order ([] if none was saved)."""
+    async with _reader() as db:
+        cursor = await db.execute(
+            "SELECT role, content FROM task_messages WHERE task_id = ? ORDER BY seq", (task_id,)
+        )
+        return [{"role": role, "content": _json_loads(content)} for role, content in await cursor.fetchall()]
+
+
+async def delete_task_messages(task_id: str):
+    """Drop a task's stored conversation once it can no longer be resumed."""
+    db = await _conn()
+    await db.execute("DELETE FROM task_messages WHERE task_id = ?", (task_id,))
+    await db.commit()
 
 
 # === Heartbeat ===
+# Heartbeats are write-only telemetry, so rows are buffered and written in
+# one executemany/commit per HEARTBEAT_FLUSH_ROWS (and on close_db).
+
+_heartbeat_buf: list[tuple] = []
+
 
 async def log_heartbeat(tasks_queued: int, tasks_active: int, budget_today: float):
-    async with aiosqlite.connect(DB_PATH) as db:
-        await db.execute(
-            """INSERT INTO heartbeats (timestamp, tasks_queued, tasks_active, budget_used_today)
-               VALUES (?, ?, ?, ?)""",
-            (_now(), tasks_queued, tasks_active, budget_today),
-        )
-        await db.commit()
+    _heartbeat_buf.append((_now(), tasks_queued, tasks_active, budget_today))
+    if len(_heartbeat_buf) >= HEARTBEAT_FLUSH_ROWS:
+        await flush_heartbeats()
+
+
+async def flush_heartbeats():
+    """Write any buffered heartbeat rows."""
+    if not _heartbeat_buf:
+        return
+    rows = _heartbeat_buf[:]
+    _heartbeat_buf.clear()
+    db = await _conn()
+    await db.executemany(
+        """INSERT INTO heartbeats (timestamp, tasks_queued, tasks_active, budget_used_today)
+           VALUES (?, ?, ?, ?)""",
+        rows,
+    )
+    await db.commit()
@@ -14,7 +14,6 @@ import anthropic
 
 import db
 from config import (
-    ANTHROPIC_API_KEY,
     COST_LIMIT_DAILY,
     MAX_STEPS_PER_TASK,
     CHECKPOINT_STEP_RATIO,
@@ -22,12 +21,17 @@ from config import (
     MAX_INPUT_TOKENS,
     MAX_OUTPUT_TOKENS,
     DEFAULT_TASK_BUDGET,
+    HISTORY_COMPACT_CHARS,
+    HISTORY_KEEP_RECENT_STEPS,
     MAX_TASK_BUDGET,
     MAX_SUBTASK_BUDGET,
+    MAX_SUBTASKS_PER_TASK,
+    PARALLEL_TOOL_FANOUT,
     PLANNER_RESERVE_BUDGET,
+    STALE_TOOL_RESULT_CHARS,
     STEPS_BY_DEPTH,
 )
-from router import classify_task, calculate_cost
+from router import classify_task, calculate_cost, client
 from context import (
     build_system_prompt,
     build_planner_prompt,
@@ -44,26 +48,39 @@ from tools import (
 )
 from tools.delegation import handle_delegation
 
-client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
-
 # Rate limit retry config
 _MAX_RETRIES = 5
 _BASE_DELAY = 15.0  # seconds — 30k tokens/min limit means ~1 call per cycle
 
 
-async def _call_claude_with_retry(*, model, max_tokens, system, messages, tools) -> anthropic.types.Message:
-    """Call Claude API with exponential backoff on rate limit (429) errors."""
+async def _call_claude_with_retry(
+    *, model, max_tokens, system, messages, tools,
+    on_tool_use: Callable[[Any], None] | None = None,
+) -> anthropic.types.Message:
+    """Stream a Claude call, with exponential backoff on rate limit (429) errors.
+
+    on_tool_use is called with each tool_use block as soon as it has fully
+    streamed, so its execution can overlap the rest of the generation.
+    """
     for attempt in range(_MAX_RETRIES):
+        notified = False
         try:
-            return await client.messages.create(
+            async with client.messages.stream(
                 model=model,
                 max_tokens=max_tokens,
                 system=system,
                 messages=messages,
                 tools=tools,
-            )
+            ) as stream:
+                if on_tool_use:
+                    async for event in stream:
+                        if event.type == "content_block_stop" and event.content_block.type == "tool_use":
+                            notified = True
+                            on_tool_use(event.content_block)
+                return await stream.get_final_message()
         except anthropic.RateLimitError as e:
-            if attempt == _MAX_RETRIES - 1:
+            # A retry would hand already-started tool calls out a second time
+            if attempt == _MAX_RETRIES - 1 or notified:
                 raise
             delay = _BASE_DELAY * (2 ** attempt)
             print(f"Rate limited (attempt {attempt + 1}/{_MAX_RETRIES}), retrying in {delay:.0f}s...")
@@ -71,20 +88,95 @@ async def _call_claude_with_retry(*, model, max_tokens, system, messages, tools)
     raise RuntimeError("Unreachable")
 
 
+_CACHE_EPHEMERAL = {"type": "ephemeral"}
+
+
+def _with_cache_breakpoint(messages: list[dict]) -> list[dict]:
+    """Copy of messages with a cache breakpoint on the last turn's final block.
+
+    Each step then reads the previous step's conversation prefix from the
+    prompt cache. The history itself is left unmarked, so there's only ever
+    one message breakpoint per request.
+    """
+    last = messages[-1]
+    content = last["content"]
+    if isinstance(content, str):
+        blocks = [{"type": "text", "text": content, "cache_control": _CACHE_EPHEMERAL}]
+    elif content and isinstance(content[-1], dict):
+        blocks = [*content[:-1], {**content[-1], "cache_control": _CACHE_EPHEMERAL}]
+    else:
+        return messages
+    return [*messages[:-1], {**last, "content": blocks}]
+
+
+# Suffix of an already-compacted tool result; such stubs are left alone so
+# the original length survives and the compacted prefix doesn't change
+_COMPACTED_RE = re.compile(r"… \[earlier result compacted, \d+ chars\]$")
+
+
+def _compact_history(messages: list[dict]) -> None:
+    """Cut old tool results in place once the history carries too much tool output.
+
+    Every step resends the whole history, so input tokens grow with each tool
+    result kept. Only the latest HISTORY_KEEP_RECENT_STEPS tool-result turns
+    stay verbatim. Compacting everything older in one go, only when over the
+    cap, keeps the cached prefix stable between compactions.
+    """
+    turns = [
+        m["content"] for m in messages
+        if m["role"] == "user" and isinstance(m["content"], list)
+        and any(isinstance(b, dict) and b.get("type") == "tool_result" for b in m["content"])
+    ]
+    size = sum(
+        len(b["content"]) for content in turns for b in content
+        if b.get("type") == "tool_result" and isinstance(b.get("content"), str)
+    )
+    if size <= HISTORY_COMPACT_CHARS:
+        return
+    for content in turns[:-HISTORY_KEEP_RECENT_STEPS]:
+        for i, block in enumerate(content):
+            text = block.get("content")
+            if (
+                block.get("type") == "tool_result" and isinstance(text, str)
+                and len(text) > STALE_TOOL_RESULT_CHARS and not _COMPACTED_RE.search(text)
+            ):
+                content[i] = {
+                    **block,
+                    "content": text[:STALE_TOOL_RESULT_CHARS] + f"… [earlier result compacted, {len(text)} chars]",
+                }
+
+
+def _jsonable(messages: list[dict]) -> list[dict]:
+    """Messages with SDK content blocks turned into plain dicts, for db.save_task_messages."""
+    return [
+        m if isinstance(m["content"], str) else {
+            "role": m["role"],
+            "content": [b if isinstance(b, dict) else b.model_dump(exclude_none=True) for b in m["content"]],
+        }
+        for m in messages
+    ]
+
+
 # Budget-parsing regex: $15 or $2.50 at start of message
 _BUDGET_RE = re.compile(r"^\$(\d+\.?\d*)\s+")
 
 # Signals that a task should be decomposed
-_DECOMPOSE_SIGNALS = [
+_DECOMPOSE_RE = re.compile("|".join(map(re.escape, [
     "explore", "write the thesis", "go through", "comprehensive", "entire",
     "all chapters", "run experiments", "and then", "step by step",
     "systematically", "complete the", "full analysis", "every",
-]
+])), re.IGNORECASE)
 
 
 class TaskResult:
     """Result of processing a task."""
 
+    # Fan-out keeps many of these alive at once; no per-instance __dict__
+    __slots__ = (
+        "task_id", "status", "response", "needs_checkpoint",
+        "checkpoint_reason", "conversation_history",
+    )
+
     def __init__(
         self,
         task_id: str,
@@ -114,14 +206,9 @@ def _parse_budget(description: str) -> tuple[float, str]:
 
 def _is_decomposable(description: str, budget: float) -> bool:
     """Cheap heuristic: should this task be decomposed by a planner?"""
-    if budget > 2.00:
+    if budget > 2.00 or len(description) > 300:
         return True
-    lower = description.lower()
-    if any(signal in lower for signal in _DECOMPOSE_SIGNALS):
-        return True
-    if len(description) > 300:
-        return True
-    return False
+    return _DECOMPOSE_RE.search(description) is not None
 
 
 async def process_task(
@@ -173,14 +260,24 @@ async def process_task(
 
 async def continue_task(
     task_id: str,
-    conversation_history: list[dict],
     budget: float,
     progress_callback: Callable[..., Coroutine] | None = None,
+    conversation_history: list[dict] | None = None,
 ) -> TaskResult:
-    """Continue a planner task after checkpoint approval."""
-    task = await db.get_task(task_id)
+    """Continue a planner task after checkpoint approval.
+
+    The conversation is loaded from the task's saved checkpoint unless given.
+    """
+    if conversation_history is None:
+        task, conversation_history = await asyncio.gather(
+            db.get_task(task_id), db.get_task_messages(task_id),
+        )
+    else:
+        task = await db.get_task(task_id)
     if not task:
         return TaskResult(task_id, "failed", "Task not found.")
+    if not conversation_history:
+        return TaskResult(task_id, "failed", "No saved conversation to resume.")
 
     await db.update_task(task_id, status="in_progress")
 
@@ -195,6 +292,122 @@ async def continue_task(
     )
 
 
+async def _build_system_prompt(role: str, depth: int, budget: float) -> str:
+    tools_desc = get_tools_description_for_depth(depth)
+    if role == "planner":
+        return await build_planner_prompt(tools_desc, budget)
+    if depth == 0:
+        # Root worker: full context with memory
+        return await build_system_prompt(tools_description=get_tools_description())
+    # Sub-worker: minimal prompt
+    return build_worker_prompt(tools_desc, budget)
+
+
+async def _build_initial_messages(
+    description: str,
+    depth: int,
+    conversation_history: list[dict] | None,
+    context_files: list[str] | None,
+) -> list[dict]:
+    if conversation_history:
+        return conversation_history
+    if depth > 0 and context_files:
+        return await build_subtask_messages(description, context_files)
+    if depth == 0:
+        keywords = extract_keywords(description)
+        return await build_messages(description, relevant_keywords=keywords)
+    return [{"role": "user", "content": description}]
+
+
+# Tools with no side effects another call in the same turn could depend on,
+# so consecutive ones can run concurrently. Writes and scripts act as barriers.
+_READ_ONLY_TOOLS = frozenset({"read_file", "list_files", "search_files"})
+_CONCURRENT_TOOLS = _READ_ONLY_TOOLS | {"delegate_task"}
+
+
+async def _run_tool_uses(
+    tool_uses: list,
+    task_id: str,
+    depth: int,
+    budget: float,
+    progress_callback: Callable[..., Coroutine] | None,
+    started: dict[str, asyncio.Task] | None = None,
+) -> list[dict]:
+    """Execute one turn's tool calls and return their tool_result blocks, in call order.
+
+    started holds calls already launched while the response streamed, by tool_use id.
+    """
+    started = started or {}
+    # Concurrent delegations all pass the subtask-count check before any of
+    # them creates its row, so cap each group at the slots still free
+    free_slots = 1
+    if PARALLEL_TOOL_FANOUT and sum(tu.name == "delegate_task" for tu in tool_uses) > 1:
+        free_slots = max(MAX_SUBTASKS_PER_TASK - await db.get_subtask_count(task_id), 1)
+
+    results: list[str] = []
+    i = 0
+    while i < len(tool_uses):
+        group = [tool_uses[i]]
+        delegations = int(group[0].name == "delegate_task")
+        if PARALLEL_TOOL_FANOUT and group[0].name in _CONCURRENT_TOOLS:
+            for tool_use in tool_uses[i + 1:]:
+                if tool_use.name not in _CONCURRENT_TOOLS:
+                    break
+                if tool_use.name == "delegate_task":
+                    if delegations >= free_slots:
+                        break
+                    delegations += 1
+                group.append(tool_use)
+        results.extend(await _run_tool_group(
+            group, delegations, task_id, depth, budget, progress_callback, started,
+        ))
+        free_slots = max(free_slots - delegations, 1)
+        i += len(group)
+
+    return [
+        {"type": "tool_result", "tool_use_id": tool_use.id, "content": text}
+        for tool_use, text in zip(tool_uses, results)
+    ]
+
+
+async def _run_tool_group(
+    group: list,
+    delegations: int,
+    task_id: str,
+    depth: int,
+    budget: float,
+    progress_callback: Callable[..., Coroutine] | None,
+    started: dict[str, asyncio.Task],
+) -> list[str]:
+    remaining = 0.0
+    if delegations:
+        # Calculate remaining budget for this task; concurrent delegations
+        # split it so that together they can't overspend
+        remaining = (budget - await db.get_task_cost(task_id)) / delegations
+
+    def _call(tool_use):
+        if tool_use.id in started:
+            return started.pop(tool_use.id)
+        if tool_use.name == "delegate_task":
+            return handle_delegation(
+                tool_use.input,
+                parent_task_id=task_id,
+                parent_depth=depth,
+                parent_budget_remaining=remaining,
+                progress_callback=progress_callback,
+            )
+        return execute_tool(tool_use.name, tool_use.input)
+
+    if len(group) == 1:
+        return [await _call(group[0])]
+    # Let every call finish before surfacing a failure, so no sub-agent is orphaned
+    results = await asyncio.gather(*map(_call, group), return_exceptions=True)
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return results
+
+
 async def run_agent_loop(
     task_id: str,
     description: str,
@@ -225,34 +438,20 @@ async def run_agent_loop(
         max_output = MAX_OUTPUT_TOKENS["planner"]
     else:
         # Workers get classified by router
-        model, tier, max_input, max_output = await classify_task(description)
-
-    await db.update_task(task_id, status="in_progress", model=model)
-
-    # System prompt
-    tools_desc = get_tools_description_for_depth(depth)
-    if role == "planner":
-        system_prompt = await build_planner_prompt(tools_desc, budget)
-    elif depth == 0:
-        # Root worker: full context with memory
-        system_prompt = await build_system_prompt(tools_description=get_tools_description())
-    else:
-        # Sub-worker: minimal prompt
-        system_prompt = build_worker_prompt(tools_desc, budget)
+        model, tier, max_input, max_output = await classify_task(description, remaining_budget=budget)
+
+    # The status write, the system prompt and the initial messages are
+    # independent (writer vs. pooled readers and file reads), so run together
+    _, system_prompt, messages = await asyncio.gather(
+        db.update_task(task_id, status="in_progress", model=model),
+        _build_system_prompt(role, depth, budget),
+        _build_initial_messages(description, depth, conversation_history, context_files),
+    )
 
     # Tools for this depth
     tools = get_tools_for_depth(depth)
-
-    # Build messages
-    if conversation_history:
-        messages = conversation_history
-    elif depth > 0 and context_files:
-        messages = build_subtask_messages(description, context_files)
-    elif depth == 0:
-        keywords = extract_keywords(description)
-        messages = await build_messages(description, relevant_keywords=keywords)
-    else:
-        messages = [{"role": "user", "content": description}]
+    # Tools + system prompt are identical on every step: cache that prefix
+    system = [{"type": "text", "text": system_prompt, "cache_control": _CACHE_EPHEMERAL}]
 
     # Step limits
     max_steps = STEPS_BY_DEPTH.get(depth, 3)
@@ -267,49 +466,36 @@ async def run_agent_loop(
             pending_tool_uses = []
             last_content = messages[-1].get("content", [])
             for block in last_content:
-                if hasattr(block, "type") and block.type == "tool_use":
+                # Reloaded checkpoints hold plain dicts rather than SDK blocks
+                if isinstance(block, dict):
+                    if block.get("type") == "tool_use":
+                        pending_tool_uses.append(anthropic.types.ToolUseBlock(**block))
+                elif block.type == "tool_use":
                     pending_tool_uses.append(block)
 
             if pending_tool_uses:
-                tool_results = []
-                for tool_use in pending_tool_uses:
-                    if tool_use.name == "delegate_task":
-                        current_task = await db.get_task(task_id)
-                        spent = current_task["token_cost"] if current_task else 0.0
-                        remaining = budget - spent
-                        result_text = await handle_delegation(
-                            tool_use.input,
-                            parent_task_id=task_id,
-                            parent_depth=depth,
-                            parent_budget_remaining=remaining,
-                            progress_callback=progress_callback,
-                        )
-                    else:
-                        result_text = await execute_tool(tool_use.name, tool_use.input)
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use.id,
-                        "content": result_text,
-                    })
+                tool_results = await _run_tool_uses(
+                    pending_tool_uses, task_id, depth, budget, progress_callback,
+                )
                 messages.append({"role": "user", "content": tool_results})
                 step += 1
                 await db.update_task(task_id, step_count=step)
 
         while step < max_steps:
             step += 1
-            await db.update_task(task_id, step_count=step)
+            # Step bump, task spend and today's spend in one DB round-trip
+            tick = await db.tick_step(task_id, step)
+            spent, daily_cost = tick if tick else (0.0, await db.get_daily_cost())
 
             # Check task budget
-            current_task = await db.get_task(task_id)
-            if current_task and current_task["token_cost"] > budget:
+            if spent > budget:
                 await db.update_task(task_id, status="stalled", error="Budget exceeded")
                 return TaskResult(
                     task_id, "stalled",
-                    f"Task halted — budget (${budget:.2f}) exceeded. Spent ${current_task['token_cost']:.4f}.",
+                    f"Task halted — budget (${budget:.2f}) exceeded. Spent ${spent:.4f}.",
                 )
 
             # Check daily limit (global safety net)
-            daily_cost = await db.get_daily_cost()
             if daily_cost > COST_LIMIT_DAILY:
                 await db.update_task(task_id, status="stalled", error="Daily cost limit exceeded")
                 return TaskResult(
@@ -317,88 +503,89 @@ async def run_agent_loop(
                     f"Daily budget limit (${COST_LIMIT_DAILY:.2f}) reached. Total today: ${daily_cost:.4f}.",
                 )
 
-            # Call Claude (with retry on rate limit)
-            response = await _call_claude_with_retry(
-                model=model,
-                max_tokens=max_output,
-                system=system_prompt,
-                messages=messages,
-                tools=tools,
-            )
-
-            # Log cost
-            cost = calculate_cost(model, response.usage.input_tokens, response.usage.output_tokens)
-            await db.log_cost(task_id, model, response.usage.input_tokens, response.usage.output_tokens, cost)
-
-            # Process response
-            assistant_content = response.content
-            text_parts = []
-            tool_uses = []
-
-            for block in assistant_content:
-                if block.type == "text":
-                    text_parts.append(block.text)
-                elif block.type == "tool_use":
-                    tool_uses.append(block)
-
-            if text_parts:
-                final_response = "\n".join(text_parts)
+            # Read-only calls that no earlier call in this turn could affect
+            # start while the rest of the response is still streaming. Not
+            # for the planner's first turn: its tools wait for plan approval.
+            started: dict[str, asyncio.Task] = {}
+            barrier = planner_first_response
+
+            def _start_early(tool_use):
+                nonlocal barrier
+                if barrier or tool_use.name not in _READ_ONLY_TOOLS:
+                    barrier = True
+                    return
+                started[tool_use.id] = asyncio.create_task(execute_tool(tool_use.name, tool_use.input))
+
+            try:
+                # Call Claude (with retry on rate limit)
+                response = await _call_claude_with_retry(
+                    model=model,
+                    max_tokens=max_output,
+                    system=system,
+                    messages=_with_cache_breakpoint(messages),
+                    tools=tools,
+                    on_tool_use=_start_early if PARALLEL_TOOL_FANOUT else None,
+                )
 
-            # Planner checkpoint: after first response, return plan for user approval
-            if planner_first_response and final_response:
-                planner_first_response = False
-                # Add this response to history for continuation
-                messages.append({"role": "assistant", "content": assistant_content})
+                # Log cost
+                usage = response.usage
+                cache_write = usage.cache_creation_input_tokens or 0
+                cache_read = usage.cache_read_input_tokens or 0
+                cost = calculate_cost(model, usage.input_tokens, usage.output_tokens, cache_write, cache_read)
+                await db.log_cost(
+                    task_id, model, usage.input_tokens + cache_write + cache_read, usage.output_tokens, cost,
+                )
 
-                # If there are tool calls, we need to checkpoint before executing them
-                if tool_uses:
-                    await db.update_task(task_id, status="checkpoint")
-                    return TaskResult(
-                        task_id, "checkpoint",
-                        final_response,
-                        needs_checkpoint=True,
-                        checkpoint_reason="Plan ready for approval",
-                        conversation_history=messages,
-                    )
+                # Process response
+                assistant_content = response.content
+                text_parts = []
+                tool_uses = []
+
+                for block in assistant_content:
+                    if block.type == "text":
+                        text_parts.append(block.text)
+                    elif block.type == "tool_use":
+                        tool_uses.append(block)
+
+                if text_parts:
+                    final_response = "\n".join(text_parts)
+
+                # Planner checkpoint: after first response, return plan for user approval
+                if planner_first_response and final_response:
+                    planner_first_response = False
+                    # Add this response to history for continuation
+                    messages.append({"role": "assistant", "content": assistant_content})
+
+                    # If there are tool calls, we need to checkpoint before executing them
+                    if tool_uses:
+                        await db.update_task(task_id, status="checkpoint")
+                        await db.save_task_messages(task_id, _jsonable(messages))
+                        return TaskResult(
+                            task_id, "checkpoint",
+                            final_response,
+                            needs_checkpoint=True,
+                            checkpoint_reason="Plan ready for approval",
+                            conversation_history=messages,
+                        )
 
-            # If no tool calls, we're done
-            if response.stop_reason == "end_turn" or not tool_uses:
-                break
+                # If no tool calls, we're done
+                if response.stop_reason == "end_turn" or not tool_uses:
+                    break
 
-            # Add assistant message to history (if not already added by checkpoint logic)
-            if not (role == "planner" and step == 1 and not conversation_history):
-                messages.append({"role": "assistant", "content": assistant_content})
+                # Add assistant message to history (if not already added by checkpoint logic)
+                if not (role == "planner" and step == 1 and not conversation_history):
+                    messages.append({"role": "assistant", "content": assistant_content})
 
-            # Execute tool calls
-            tool_results = []
-            for tool_use in tool_uses:
-                if tool_use.name == "delegate_task":
-                    # Calculate remaining budget for this task
-                    current_task = await db.get_task(task_id)
-                    spent = current_task["token_cost"] if current_task else 0.0
-                    remaining = budget - spent
-
-                    result_text = await handle_delegation(
-                        tool_use.input,
-                        parent_task_id=task_id,
-                        parent_depth=depth,
-                        parent_budget_remaining=remaining,
-                        progress_callback=progress_callback,
-                    )
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use.id,
-                        "content": result_text,
-                    })
-                else:
-                    result_text = await execute_tool(tool_use.name, tool_use.input)
-                    tool_results.append({
-                        "type": "tool_result",
-                        "tool_use_id": tool_use.id,
-                        "content": result_text,
-                    })
+                # Execute tool calls
+                tool_results = await _run_tool_uses(tool_uses, task_id, depth, budget, progress_callback, started)
+            finally:
+                # Early-started calls not consumed (checkpoint, end of turn, or
+                # an error) would otherwise keep running unowned
+                for early in started.values():
+                    early.cancel()
 
             messages.append({"role": "user", "content": tool_results})
+            _compact_history(messages)
 
             # Uncertainty checkpoint (depth=0 workers only)
             if depth == 0 and role == "worker" and final_response:
@@ -412,7 +599,10 @@ async def run_agent_loop(
                     )
 
         # Task completed — summarize and store
-        await db.update_task(task_id, status="completed", result=final_response[:1000])
+        await asyncio.gather(
+            db.update_task(task_id, status="completed", result=final_response[:1000]),
+            db.delete_task_messages(task_id),
+        )
 
         # Save session memory only for depth=0
         if depth == 0:
@@ -430,7 +620,10 @@ async def run_agent_loop(
 
     except Exception as e:
         error_msg = str(e)
-        await db.update_task(task_id, status="failed", error=error_msg)
+        await asyncio.gather(
+            db.update_task(task_id, status="failed", error=error_msg),
+            db.delete_task_messages(task_id),
+        )
         return TaskResult(task_id, "failed", f"Task failed: {error_msg}")
 
 
@@ -466,45 +659,39 @@ async def run_subtask(
     )
 
 
+# Phrases in a response that indicate uncertainty worth a checkpoint,
+# matched in one pass over the text
+_UNCERTAINTY_RE = re.compile("|".join(map(re.escape, [
+    "i'm not sure",
+    "i'm unsure",
+    "this could go either way",
+    "do you want me to",
+    "should i proceed",
+    "before i continue",
+    "a few options",
+    "which approach",
+    "let me know if",
+    "would you prefer",
+])), re.IGNORECASE)
+
+
 def _should_checkpoint(response_text: str, task_description: str) -> bool:
     """Check if Claude's response indicates uncertainty that warrants a checkpoint."""
-    uncertainty_markers = [
-        "i'm not sure",
-        "i'm unsure",
-        "this could go either way",
-        "do you want me to",
-        "should i proceed",
-        "before i continue",
-        "a few options",
-        "which approach",
-        "let me know if",
-        "would you prefer",
-    ]
-    lower = response_text.lower()
-    return any(marker in lower for marker in uncertainty_markers)
+    return _UNCERTAINTY_RE.search(response_text) is not None
 
 
 async def get_status() -> str:
     """Get a status summary for the heartbeat."""
-    active = await db.get_active_tasks()
-    daily = await db.get_daily_cost()
-    monthly = await db.get_monthly_cost()
-
-    queued = sum(1 for t in active if t["status"] == "queued")
-    in_progress = sum(1 for t in active if t["status"] == "in_progress")
+    snap = await db.get_status_snapshot()
 
     return (
         f"**Status**\n"
-        f"Queue: {queued} | Active: {in_progress}\n"
-        f"Today: ${daily:.4f} | Month: ${monthly:.4f}"
+        f"Queue: {snap['queued']} | Active: {snap['in_progress']}\n"
+        f"Today: ${snap['daily']:.4f} | Month: ${snap['monthly']:.4f}"
     )
 
 
 async def recover_stale_tasks() -> list[str]:
     """Find and handle tasks stuck in 'in_progress' (crash recovery)."""
-    stale = await db.get_stale_tasks()
-    messages = []
-    for task in stale:
-        await db.update_task(task["id"], status="failed", error="Recovered after restart — was in_progress")
-        messages.append(f"Recovered stale task `{task['id']}`: {task['description'][:80]}")
-    return messages
+    stale = await db.fail_stale_tasks("Recovered after restart — was in_progress")
+    return [f"Recovered stale task `{task_id}`: {desc[:80]}" for task_id, desc in stale]
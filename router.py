@@ -2,18 +2,28 @@
 Thesis Bot — Router
 Classifies tasks and selects the appropriate model (Haiku vs Sonnet).
 """
+import time
+from collections import OrderedDict
+
 import anthropic
 
 from config import (
     ANTHROPIC_API_KEY,
+    HAIKU_ONLY_BUDGET,
+    CACHE_READ_MULTIPLIER,
+    CACHE_WRITE_MULTIPLIER,
     MODEL_HAIKU,
     MODEL_SONNET,
     MODEL_SONNET_LATEST,
     MAX_INPUT_TOKENS,
     MAX_OUTPUT_TOKENS,
     PRICING,
+    ROUTER_CACHE_MAX,
+    ROUTER_CACHE_TTL_SECONDS,
 )
 
+# One client (and so one connection pool) for every Anthropic call in the
+# bot; the orchestrator imports it from here
 client = anthropic.AsyncAnthropic(api_key=ANTHROPIC_API_KEY)
 
 ROUTER_PROMPT = """Classify this task into exactly one category. Respond with ONLY the category name, nothing else.
@@ -24,9 +34,39 @@ SONNET — thesis writing, analysis, experiment design, code debugging, multi-st
 Task: {task_description}"""
 
 
+# Routing decisions for recently seen task texts: normalized description ->
+# (expires_at, result). Repeats ("list files in data/") skip the Haiku call.
+_decisions: OrderedDict[str, tuple[float, tuple[str, str, int, int]]] = OrderedDict()
+
+
+def _cache_key(description: str) -> str:
+    return " ".join(description.lower().split())
+
+
+def _cached_decision(key: str) -> tuple[str, str, int, int] | None:
+    entry = _decisions.get(key)
+    if entry is None:
+        return None
+    if entry[0] < time.monotonic():
+        del _decisions[key]
+        return None
+    _decisions.move_to_end(key)
+    return entry[1]
+
+
+def _remember_decision(key: str, result: tuple[str, str, int, int]) -> tuple[str, str, int, int]:
+    _decisions[key] = (time.monotonic() + ROUTER_CACHE_TTL_SECONDS, result)
+    _decisions.move_to_end(key)
+    while len(_decisions) > ROUTER_CACHE_MAX:
+        _decisions.popitem(last=False)
+    return result
+
+
 async def classify_task(
     description: str,
     force_model: str | None = None,
+    *,
+    remaining_budget: float | None = None,
 ) -> tuple[str, str, int, int]:
     """
     Classify a task and return (model, tier, max_input, max_output).
@@ -35,6 +75,8 @@ async def classify_task(
     Args:
         description: Task description to classify
         force_model: Optional model override — skip classification entirely
+        remaining_budget: Optional USD left for the task — below HAIKU_ONLY_BUDGET
+            the task goes to Haiku without classification
 
     Returns:
         model: The model string to use
@@ -57,6 +99,15 @@ async def classify_task(
         description = description[6:].strip()
         return MODEL_HAIKU, "simple", MAX_INPUT_TOKENS["simple"], MAX_OUTPUT_TOKENS["simple"]
 
+    # A single Sonnet step would blow a budget this small; don't spend a call finding out
+    if remaining_budget is not None and remaining_budget < HAIKU_ONLY_BUDGET:
+        return MODEL_HAIKU, "simple", MAX_INPUT_TOKENS["simple"], MAX_OUTPUT_TOKENS["simple"]
+
+    key = _cache_key(description)
+    cached = _cached_decision(key)
+    if cached:
+        return cached
+
     try:
         response = await client.messages.create(
             model=MODEL_HAIKU,
@@ -70,12 +121,14 @@ async def classify_task(
         classification = response.content[0].text.strip().upper()
 
         if "HAIKU" in classification:
-            return MODEL_HAIKU, "simple", MAX_INPUT_TOKENS["simple"], MAX_OUTPUT_TOKENS["simple"]
+            result = MODEL_HAIKU, "simple", MAX_INPUT_TOKENS["simple"], MAX_OUTPUT_TOKENS["simple"]
+        # Default to Sonnet for anything non-trivial
+        elif len(description) > 500 or any(kw in lower for kw in ["write", "analyze", "design", "debug", "compare", "explain"]):
+            result = MODEL_SONNET, "complex", MAX_INPUT_TOKENS["complex"], MAX_OUTPUT_TOKENS["complex"]
         else:
-            # Default to Sonnet for anything non-trivial
-            if len(description) > 500 or any(kw in lower for kw in ["write", "analyze", "design", "debug", "compare", "explain"]):
-                return MODEL_SONNET, "complex", MAX_INPUT_TOKENS["complex"], MAX_OUTPUT_TOKENS["complex"]
-            return MODEL_SONNET, "standard", MAX_INPUT_TOKENS["standard"], MAX_OUTPUT_TOKENS["standard"]
+            result = MODEL_SONNET, "standard", MAX_INPUT_TOKENS["standard"], MAX_OUTPUT_TOKENS["standard"]
+        # Only real classifications are cached, never the error fallback below
+        return _remember_decision(key, result)
 
     except Exception as e:
         # If routing fails, default to Sonnet standard (safe fallback)
@@ -83,9 +136,19 @@ async def classify_task(
         return MODEL_SONNET, "standard", MAX_INPUT_TOKENS["standard"], MAX_OUTPUT_TOKENS["standard"]
 
 
-def calculate_cost(model: str, input_tokens: int, output_tokens: int) -> float:
-    """Calculate USD cost for an API call."""
+def calculate_cost(
+    model: str,
+    input_tokens: int,
+    output_tokens: int,
+    cache_write_tokens: int = 0,
+    cache_read_tokens: int = 0,
+) -> float:
+    """Calculate USD cost for an API call (input_tokens excludes cached prompt tokens)."""
     pricing = PRICING.get(model, PRICING[MODEL_SONNET])
-    input_cost = (input_tokens / 1_000_000) * pricing["input"]
+    input_cost = (
+        input_tokens
+        + cache_write_tokens * CACHE_WRITE_MULTIPLIER
+        + cache_read_tokens * CACHE_READ_MULTIPLIER
+    ) / 1_000_000 * pricing["input"]
     output_cost = (output_tokens / 1_000_000) * pricing["output"]
     return input_cost + output_cost
@@ -0,0 +1,32 @@
+import copy
+
+from config import HISTORY_COMPACT_CHARS, STALE_TOOL_RESULT_CHARS
+from orchestrator import _compact_history
+
+
+def _history(n_steps, result_chars):
+    messages = [{"role": "user", "content": "task"}]
+    for step in range(n_steps):
+        messages.append({"role": "assistant", "content": [{"type": "text", "text": f"step {step}"}]})
+        messages.append({"role": "user", "content": [
+            {"type": "tool_result", "tool_use_id": f"tu{step}", "content": "x" * result_chars},
+        ]})
+    return messages
+
+
+def test_compacts_old_results_only():
+    messages = _history(4, HISTORY_COMPACT_CHARS // 2)
+    _compact_history(messages)
+    results = [m["content"][0]["content"] for m in messages if m["role"] == "user" and isinstance(m["content"], list)]
+    assert results[0].startswith("x" * STALE_TOOL_RESULT_CHARS)
+    assert results[0].endswith(f"[earlier result compacted, {HISTORY_COMPACT_CHARS // 2} chars]")
+    assert results[-1] == "x" * (HISTORY_COMPACT_CHARS // 2)
+
+
+def test_second_call_is_a_no_op():
+    # The two recent results alone keep the history over the cap
+    messages = _history(4, HISTORY_COMPACT_CHARS)
+    _compact_history(messages)
+    once = copy.deepcopy(messages)
+    _compact_history(messages)
+    assert messages == once
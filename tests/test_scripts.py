@@ -0,0 +1,62 @@
+import pytest
+
+from tools.scripts import _is_dangerous
+
+BLOCKED = [
+    "rm -rf /",
+    "rm  -rf  /",
+    "rm -fR ~",
+    "/bin/rm -r $HOME/thesis",
+    "rm --recursive /etc",
+    "rm -rf -- /",
+    "echo 'rm -rf /tmp'",
+    "ls; rm -rf /",
+    "true && rm -rf /var",
+    "sudo rm -rf /",
+    "sudo -u root rm -rf /",
+    "sudo -- rm -rf /",
+    "env -i rm -rf /",
+    "env FOO=1 rm -rf /",
+    "env -S 'rm -rf /'",
+    "FOO=1 rm -rf /",
+    "nice -n 5 rm -rf /",
+    "time -p rm -rf /",
+    "timeout 5 rm -rf /",
+    "timeout -s KILL 5 rm -rf /",
+    "stdbuf -o0 rm -rf /",
+    "nohup rm -rf /",
+    "xargs -n 1 rm -rf /",
+    "sh -c 'rm -rf /'",
+    "bash -c \"rm  -r /home\"",
+    "eval rm -rf /",
+    "mkfs.ext4 /dev/sda1",
+    "dd if=/dev/zero of=/dev/sda",
+    "echo x > /dev/sda",
+    ":(){ :|:& };:",
+    "f(){ f|f& };f",
+]
+
+ALLOWED = [
+    "ls -la",
+    "rm -rf build",
+    "rm -r ./tmp",
+    "rm file.txt /tmp/x",
+    "rm -- -rf /",
+    "echo hello >/dev/null",
+    "sudo -u simen ls /",
+    "timeout 5 python script.py",
+    "nice -n 5 make",
+    "env -i PATH=/usr/bin python -V",
+    "git status && git diff",
+    "grep -r pattern .",
+]
+
+
+@pytest.mark.parametrize("command", BLOCKED)
+def test_blocked(command):
+    assert _is_dangerous(command)
+
+
+@pytest.mark.parametrize("command", ALLOWED)
+def test_allowed(command):
+    assert not _is_dangerous(command)
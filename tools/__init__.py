@@ -18,20 +18,33 @@ for tool in SCRIPT_TOOLS:
     TOOL_HANDLERS[tool["name"]] = handle_script_tool
 
 
+def _describe(tools: list[dict]) -> str:
+    return "\n".join(f"- {tool['name']}: {tool['description']}" for tool in tools)
+
+
+# Tools per depth never change, so build the lists and descriptions once.
+# Handing out the same list each step also keeps the request prefix stable.
+_TOOLS_BY_DEPTH = {
+    depth: ALL_TOOLS + DELEGATION_TOOLS if depth < MAX_DELEGATION_DEPTH else ALL_TOOLS
+    for depth in range(MAX_DELEGATION_DEPTH + 1)
+}
+_DESCRIPTION_BY_DEPTH = {depth: _describe(tools) for depth, tools in _TOOLS_BY_DEPTH.items()}
+_ALL_TOOLS_DESCRIPTION = _describe(ALL_TOOLS)
+
+
 def get_tools_for_depth(depth: int) -> list[dict]:
-    """Return tool definitions available at a given depth."""
-    if depth < MAX_DELEGATION_DEPTH:
-        return ALL_TOOLS + DELEGATION_TOOLS
-    return ALL_TOOLS
+    """Return tool definitions available at a given depth (shared — don't mutate)."""
+    return _TOOLS_BY_DEPTH.get(depth, ALL_TOOLS)
 
 
 def get_tools_description_for_depth(depth: int) -> str:
     """Get a human-readable description of tools available at a given depth."""
-    tools = get_tools_for_depth(depth)
-    lines = []
-    for tool in tools:
-        lines.append(f"- {tool['name']}: {tool['description']}")
-    return "\n".join(lines)
+    return _DESCRIPTION_BY_DEPTH.get(depth, _ALL_TOOLS_DESCRIPTION)
+
+
+# Tool output longer than this is cut to _OUTPUT_KEEP_CHARS before it reaches the model
+_OUTPUT_MAX_CHARS = 8000
+_OUTPUT_KEEP_CHARS = 7500
 
 
 async def execute_tool(name: str, input_data: dict) -> str:
@@ -42,8 +55,8 @@ async def execute_tool(name: str, input_data: dict) -> str:
     try:
         result = await handler(name, input_data)
         # Truncate long outputs
-        if len(result) > 8000:
-            return result[:7500] + f"\n\n... [truncated, {len(result)} chars total]"
+        if len(result) > _OUTPUT_MAX_CHARS:
+            return result[:_OUTPUT_KEEP_CHARS] + f"\n\n... [truncated, {len(result)} chars total]"
         return result
     except Exception as e:
         return f"Error executing {name}: {str(e)}"
@@ -51,7 +64,4 @@ async def execute_tool(name: str, input_data: dict) -> str:
 
 def get_tools_description() -> str:
     """Get a human-readable description of available tools."""
-    lines = []
-    for tool in ALL_TOOLS:
-        lines.append(f"- {tool['name']}: {tool['description']}")
-    return "\n".join(lines)
+    return _ALL_TOOLS_DESCRIPTION
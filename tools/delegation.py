@@ -16,6 +16,10 @@ from config import (
 if TYPE_CHECKING:
     pass
 
+# Subtask results longer than this are cut to _RESULT_KEEP_CHARS for the parent
+_RESULT_MAX_CHARS = 500
+_RESULT_KEEP_CHARS = 450
+
 DELEGATION_TOOLS = [
     {
         "name": "delegate_task",
@@ -110,8 +114,7 @@ async def handle_delegation(
     )
 
     # Cascade cost to parent chain
-    child_task = await db.get_task(result.task_id)
-    child_cost = child_task["token_cost"] if child_task else 0.0
+    child_cost = await db.get_task_cost(result.task_id)
     await db.cascade_cost_to_parent(result.task_id, child_cost)
 
     # Fire progress callback
@@ -126,8 +129,8 @@ async def handle_delegation(
     # Truncate result for the parent context — keep short to avoid blowing up
     # the planner's input tokens on subsequent calls
     response = result.response or "(no output)"
-    if len(response) > 500:
-        response = response[:450] + f"\n... [truncated, {len(response)} chars total]"
+    if len(response) > _RESULT_MAX_CHARS:
+        response = response[:_RESULT_KEEP_CHARS] + f"\n... [truncated, {len(response)} chars total]"
 
     status_prefix = f"[{result.status}] " if result.status != "completed" else ""
     return f"{status_prefix}Subtask result (${child_cost:.4f}):\n{response}"
@@ -1,10 +1,37 @@
 """
 File operation tools for the thesis bot.
 """
+import asyncio
+import base64
+import fnmatch
+import functools
+import json
 import os
 import glob
+import itertools
+import mmap
+import re
+import shutil
+import threading
+from collections import OrderedDict
 from config import THESIS_DIR
 
+# ripgrep, when installed, does search_files' walk and matching natively
+_RG = shutil.which("rg")
+_SEARCH_MAX_MATCHES = 20
+# So one huge log can't stall the fallback search (line-by-line / whole-file modes)
+_SEARCH_MAX_LINES_PER_FILE = 100_000
+_SEARCH_MAX_BYTES_PER_FILE = 8 * 1024 * 1024
+# Files above this are mmapped by read_file/edit_file rather than read whole
+_MMAP_MIN_BYTES = 1024 * 1024
+_COUNT_CHUNK = 1024 * 1024
+
+# Recently read (small) files: path -> (mtime_ns, size, text, line count).
+# Agents often re-read the same file on consecutive steps while editing it.
+_READ_CACHE: OrderedDict[str, tuple[int, int, str, int]] = OrderedDict()
+_READ_CACHE_MAX = 32
+_READ_CACHE_LOCK = threading.Lock()  # file tools run in worker threads
+
 FILE_TOOLS = [
     {
         "name": "read_file",
@@ -30,7 +57,7 @@ FILE_TOOLS = [
     },
     {
         "name": "write_file",
-        "description": "Write content to a file. Creates directories if needed. Overwrites existing files.",
+        "description": "Write content to a file, or copy another file with from_path. Creates directories if needed. Overwrites existing files. Give content, from_path, or both.",
         "input_schema": {
             "type": "object",
             "properties": {
@@ -40,10 +67,17 @@ FILE_TOOLS = [
                 },
                 "content": {
                     "type": "string",
-                    "description": "Content to write.",
+                    "description": "Content to write (appended after from_path's contents if both are given).",
+                },
+                "from_path": {
+                    "type": "string",
+                    "description": (
+                        "Optional file to copy into path, relative to the thesis directory. "
+                        "Use instead of pasting an existing file's contents."
+                    ),
                 },
             },
-            "required": ["path", "content"],
+            "required": ["path"],
         },
     },
     {
@@ -106,15 +140,377 @@ FILE_TOOLS = [
 ]
 
 
+@functools.lru_cache(maxsize=512)
 def _resolve_path(path: str) -> str:
-    """Resolve path relative to thesis directory."""
-    if os.path.isabs(path):
-        return path
-    return os.path.join(THESIS_DIR, path)
+    """Resolve path relative to thesis directory.
+
+    Normalized, so "./a//b" and "a/b" share _READ_CACHE / _KNOWN_DIRS entries.
+    """
+    if not os.path.isabs(path):
+        path = os.path.join(THESIS_DIR, path)
+    return os.path.normpath(path)
+
+
+def _line_span(buf, start: int, end: int) -> tuple[int, int, int]:
+    """(begin, stop, lines before stop) of lines [start, end) in a str, bytes or mmap.
+
+    Walks newlines with find() up to end only, so nothing past the requested
+    lines is split or copied.
+    """
+    nl = "\n" if isinstance(buf, str) else b"\n"
+    size = len(buf)
+    pos = line = 0
+    begin = None
+    while line < end and pos < size:
+        if line == start:
+            begin = pos
+        found = buf.find(nl, pos)
+        pos = size if found == -1 else found + 1
+        line += 1
+    return (pos if begin is None else begin), pos, line
+
+
+def _read_lines_mmap(path: str, start: int, end: int) -> tuple[str, int]:
+    """(lines [start, end) as text, total line count) of a large file, via mmap.
+
+    Only the requested lines are decoded; the rest of the file is just
+    scanned for newlines, so memory stays O(slice) instead of O(file).
+    """
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if hasattr(mm, "madvise"):
+            mm.madvise(mmap.MADV_SEQUENTIAL)
+        size = len(mm)
+        begin, pos, total = _line_span(mm, start, end)
+        text = mm[begin:pos].decode("utf-8").replace("\r\n", "\n")
+        if pos < size:
+            total += sum(mm[off:off + _COUNT_CHUNK].count(b"\n") for off in range(pos, size, _COUNT_CHUNK))
+            total += mm[size - 1] != ord("\n")
+    return text, total
+
+
+def _edit_mmap(path: str, old_text: str, new_text: str) -> int:
+    """edit_file for a large file: count old_text via mmap, rewrite only if it's unique.
+
+    Returns the occurrence count; the file is changed only when it's 1.
+    Like the text-mode path, "\n" in old_text matches a CRLF file's line
+    endings; new_text is written with the file's CRLF endings.
+    """
+    old, new = old_text.encode("utf-8"), new_text.encode("utf-8")
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if b"\n" in old and b"\r\n" not in old and mm.find(b"\r\n") != -1:
+            old, new = old.replace(b"\n", b"\r\n"), new.replace(b"\n", b"\r\n")
+        first = pos = mm.find(old)
+        count = 0
+        while pos != -1:
+            count += 1
+            pos = mm.find(old, pos + len(old))
+        if count != 1:
+            return count
+        # Built before the file is reopened for writing, which truncates it
+        content = b"".join((mm[:first], new, mm[first + len(old):]))
+    with open(path, "wb") as f:
+        f.write(content)
+    return 1
+
+
+# Directories write_file has already created (or found), so repeat writes
+# into the same place skip makedirs' stat per path component
+_KNOWN_DIRS: set[str] = set()
+
+
+def _ensure_dir(directory: str) -> None:
+    if directory not in _KNOWN_DIRS:
+        os.makedirs(directory, exist_ok=True)
+        _KNOWN_DIRS.add(directory)
+
+
+def _write_file(path: str, content: str, src: str | None) -> None:
+    """write_file's write: copy src (if given) into path, then write/append content."""
+    if src:
+        # Kernel-side copy (sendfile / fcopyfile); the data never passes through Python
+        shutil.copyfile(src, path)
+        if content:
+            with open(path, "a") as f:
+                f.write(content)
+    else:
+        with open(path, "w") as f:
+            f.write(content)
+
+
+def _read_text_cached(path: str) -> tuple[str, int]:
+    """(text, line count) of a small file, served from _READ_CACHE while it is unchanged."""
+    st = os.stat(path)
+    with _READ_CACHE_LOCK:
+        entry = _READ_CACHE.get(path)
+        if entry and entry[0] == st.st_mtime_ns and entry[1] == st.st_size:
+            _READ_CACHE.move_to_end(path)
+            return entry[2], entry[3]
+    # One read() into one string; counting lines is then a C-level scan
+    with open(path, "r") as f:
+        text = f.read()
+    total = text.count("\n") + (bool(text) and not text.endswith("\n"))
+    with _READ_CACHE_LOCK:
+        _READ_CACHE[path] = (st.st_mtime_ns, st.st_size, text, total)
+        _READ_CACHE.move_to_end(path)
+        while len(_READ_CACHE) > _READ_CACHE_MAX:
+            _READ_CACHE.popitem(last=False)
+    return text, total
+
+
+def _forget_read(path: str) -> None:
+    with _READ_CACHE_LOCK:
+        _READ_CACHE.pop(path, None)
+
+
+def _list_dir(dir_path: str, pattern: str) -> tuple[int, list[tuple[str, bool, int]]]:
+    """(match count, (name, is_dir, size) of the first 50 by name) for list_files."""
+    if "/" in pattern or os.sep in pattern:
+        paths = sorted(glob.glob(os.path.join(dir_path, pattern)))
+        return len(paths), [(os.path.basename(m), os.path.isdir(m), os.stat(m).st_size) for m in paths[:50]]
+    # A single path component: one scandir pass gives names and types, and
+    # only the entries actually shown get stat'ed. Hidden files as glob does.
+    hidden = pattern.startswith(".")
+    with os.scandir(dir_path) as it:
+        entries = [
+            e for e in it
+            if (hidden or not e.name.startswith(".")) and fnmatch.fnmatchcase(e.name, pattern)
+        ]
+    entries.sort(key=lambda e: e.name)
+    return len(entries), [(e.name, e.is_dir(), e.stat().st_size) for e in entries[:50]]
+
+
+async def _rg_search(base: str, file_pat: str, search_pat: str) -> list[str] | None:
+    """search_files via ripgrep. None if rg is missing or failed (e.g. a pattern it can't parse)."""
+    # rg matches --glob against paths under its cwd, so absolute or ../
+    # patterns would match nothing; leave those to glob
+    if not _RG or os.path.isabs(file_pat) or ".." in file_pat:
+        return None
+    # Same files as glob: hidden files skipped, .gitignore not applied, and a
+    # pattern without a "/" only matching at the top level
+    args = [_RG, "--json", "--ignore-case", "--no-ignore", "--max-count", str(_SEARCH_MAX_MATCHES),
+            "--glob", file_pat]
+    if "/" not in file_pat:
+        args += ["--max-depth", "1"]
+    proc = await asyncio.create_subprocess_exec(
+        *args, "--regexp", search_pat,
+        cwd=base,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.DEVNULL,
+        limit=1024 * 1024,
+    )
+    matches = []
+    try:
+        async for raw in proc.stdout:
+            event = json.loads(raw)
+            if event["type"] != "match":
+                continue
+            data = event["data"]
+            lines = data["lines"]
+            if "text" in lines:
+                text = lines["text"]
+            else:  # not valid UTF-8: rg sends the raw bytes base64-encoded
+                text = base64.b64decode(lines["bytes"]).decode("utf-8", "replace")
+            matches.append(f"  {data['path'].get('text', '?')}:{data['line_number']}: {text.rstrip()}")
+            if len(matches) >= _SEARCH_MAX_MATCHES:
+                break
+    except ValueError:  # a single line longer than the stream limit
+        pass
+    finally:
+        if proc.returncode is None:
+            proc.kill()
+        await proc.wait()
+    # Exit 1 is "no matches"; 2 with nothing found means rg itself failed
+    if not matches and proc.returncode not in (0, 1):
+        return None
+    return matches
+
+
+def _required_literal(pattern: str) -> str:
+    """Longest plain substring every match of pattern must contain ("" if unsure).
+
+    Only top-level text counts: groups, classes, escapes and anything a
+    quantifier can drop are skipped, and alternation or inline flags give up.
+    """
+    if "|" in pattern or "(?" in pattern:
+        return ""
+    best = run = ""
+    depth = 0
+    i, n = 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "\\":
+            i += 1
+        elif c == "[":
+            i += 1
+            if i < n and pattern[i] == "^":
+                i += 1
+            if i < n and pattern[i] == "]":
+                i += 1
+            while i < n and pattern[i] != "]":
+                i += 2 if pattern[i] == "\\" else 1
+        elif c == "{":
+            run = run[:-1]
+            while i < n and pattern[i] != "}":
+                i += 1
+        elif c in "?*":
+            run = run[:-1]
+        elif c == "(":
+            depth += 1
+        elif c == ")":
+            depth = max(depth - 1, 0)
+        elif depth == 0 and c not in ".^$+":
+            run += c
+            i += 1
+            continue
+        best = max(best, run, key=len)
+        run = ""
+        i += 1
+    return max(best, run, key=len)
+
+
+def _blob_hits(regex: re.Pattern, blob: bytes):
+    """(line number, line) for each line of blob the regex matches, from whole-blob searches.
+
+    One regex.search over the blob finds the next candidate instead of a call
+    per line. A candidate match may run across a newline, so its line is
+    re-checked on its own before it counts. Only valid for patterns without
+    line anchors or lookarounds, which could see past the line's bounds.
+    """
+    pos = counted = 0
+    lineno = 1
+    size = len(blob)
+    while pos < size:
+        m = regex.search(blob, pos)
+        if not m:
+            return
+        start = blob.rfind(b"\n", 0, m.start()) + 1
+        end = blob.find(b"\n", m.start())
+        end = size if end == -1 else end + 1
+        lineno += blob.count(b"\n", counted, start)
+        counted = start
+        line = blob[start:end]
+        if regex.search(line):
+            yield lineno, line
+        pos = end
+
+
+# Escapes whose meaning narrows to ASCII when matching bytes
+_UNICODE_CLASS_RE = re.compile(r"\\[wWbBsSdD]")
+
+
+def _lf_line(line: bytes) -> bytes:
+    """line with a CRLF ending turned into LF, as text mode would read it (so $ still matches)."""
+    return line[:-2] + b"\n" if line.endswith(b"\r\n") else line
+
+
+def _search_files(base: str, file_pat: str, search_pat: str) -> list[str]:
+    """search_files in Python, for when ripgrep isn't available."""
+    # ASCII patterns match raw bytes, so only hit lines are ever decoded (re's
+    # IGNORECASE is ASCII-only on bytes, which is all such a pattern needs).
+    # Not with \w, \b, \s or \d: on bytes those are ASCII-only too, and
+    # would stop l\w+ning from matching "løsning".
+    raw = search_pat.isascii() and not _UNICODE_CLASS_RE.search(search_pat)
+    regex = re.compile(search_pat.encode() if raw else search_pat, re.IGNORECASE)
+    # Lines without the pattern's required literal can't match; a substring
+    # test rules them out far cheaper than the regex
+    literal = _required_literal(search_pat).lower().encode() if raw else b""
+    # Without anchors or lookarounds a file can be searched as one blob
+    blob_ok = raw and not any(a in search_pat.replace("[^", "[") for a in ("^", "$", "(?", "\\A", "\\Z"))
+    matches = []
+    # iglob walks lazily, so stopping at the match cap also stops the walk
+    for filepath in glob.iglob(os.path.join(base, file_pat), recursive=True):
+        if os.path.isdir(filepath):
+            continue
+        try:
+            with open(filepath, "rb") as f:
+                head = f.read(1024)
+                if b"\0" in head:  # binary file
+                    continue
+                if blob_ok:
+                    blob = head + f.read(_SEARCH_MAX_BYTES_PER_FILE - len(head))
+                    if literal and literal not in blob.lower():
+                        continue
+                    hits = _blob_hits(regex, blob)
+                else:
+                    f.seek(0)
+                    hits = (
+                        (i, line) for i, line in enumerate(
+                            map(_lf_line, itertools.islice(f, _SEARCH_MAX_LINES_PER_FILE)), 1,
+                        )
+                        if not (literal and literal not in line.lower())
+                        and regex.search(line if raw else line.decode("utf-8", "replace"))
+                    )
+                for i, line in hits:
+                    rel = os.path.relpath(filepath, base)
+                    matches.append(f"  {rel}:{i}: {line.decode('utf-8', 'replace').rstrip()}")
+                    if len(matches) >= _SEARCH_MAX_MATCHES:
+                        break
+        except PermissionError:
+            continue
+        if len(matches) >= _SEARCH_MAX_MATCHES:
+            break
+    return matches
+
+
+def _read_file(path: str, start: int, end: int) -> str:
+    """read_file's blocking part: the header plus lines [start, end)."""
+    start = max(start, 0)
+    try:
+        if os.path.getsize(path) > _MMAP_MIN_BYTES:
+            content, total = _read_lines_mmap(path, start, end)
+        else:
+            text, total = _read_text_cached(path)
+            begin, stop, _ = _line_span(text, start, end)
+            content = text[begin:stop]
+        header = f"[{path} — lines {start+1}-{min(end, total)} of {total}]\n"
+        return header + content
+    except UnicodeDecodeError:
+        return f"Cannot read binary file: {path}"
+
+
+def _write(path: str, content: str, src: str | None) -> str:
+    """write_file's blocking part."""
+    _ensure_dir(os.path.dirname(path))
+    # mtime alone can miss a same-size rewrite within its granularity
+    _forget_read(path)
+    try:
+        _write_file(path, content, src)
+    except FileNotFoundError:
+        # The directory was removed since we last made it
+        _KNOWN_DIRS.discard(os.path.dirname(path))
+        _ensure_dir(os.path.dirname(path))
+        _write_file(path, content, src)
+    size = os.path.getsize(path)
+    return f"Written {size} bytes to {path}"
+
+
+def _edit_file(path: str, old_text: str, new_text: str) -> str:
+    """edit_file's blocking part."""
+    if not old_text:
+        return "old_text must not be empty."
+    _forget_read(path)
+    large = os.path.getsize(path) > _MMAP_MIN_BYTES
+    if large:
+        count = _edit_mmap(path, old_text, new_text)
+    else:
+        with open(path, "r") as f:
+            content = f.read()
+        count = content.count(old_text)
+    if count == 0:
+        return f"Text not found in {path}"
+    if count > 1:
+        return f"Text appears {count} times in {path} — must be unique. Provide more context."
+    if not large:  # _edit_mmap has already written its change
+        new_content = content.replace(old_text, new_text, 1)
+        with open(path, "w") as f:
+            f.write(new_content)
+    return f"Edited {path}: replaced 1 occurrence."
 
 
 async def handle_file_tool(name: str, input_data: dict) -> str:
     """Handle file operation tools."""
+    # File reads/writes run in worker threads, so a large file doesn't
+    # freeze the event loop (Discord heartbeats, other tasks' tool calls)
 
     if name == "read_file":
         path = _resolve_path(input_data["path"])
@@ -122,84 +518,52 @@ async def handle_file_tool(name: str, input_data: dict) -> str:
             return f"File not found: {path}"
         start = input_data.get("start_line", 1) - 1  # convert to 0-indexed
         end = input_data.get("end_line", 200)
-        try:
-            with open(path, "r") as f:
-                lines = f.readlines()
-            total = len(lines)
-            selected = lines[start:end]
-            content = "".join(selected)
-            header = f"[{path} — lines {start+1}-{min(end, total)} of {total}]\n"
-            return header + content
-        except UnicodeDecodeError:
-            return f"Cannot read binary file: {path}"
+        return await asyncio.to_thread(_read_file, path, start, end)
 
     elif name == "write_file":
         path = _resolve_path(input_data["path"])
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        with open(path, "w") as f:
-            f.write(input_data["content"])
-        size = os.path.getsize(path)
-        return f"Written {size} bytes to {path}"
+        if "content" not in input_data and not input_data.get("from_path"):
+            return "write_file needs content or from_path; nothing written."
+        src = None
+        if input_data.get("from_path"):
+            src = _resolve_path(input_data["from_path"])
+            if not os.path.isfile(src):
+                return f"File not found: {src}"
+        return await asyncio.to_thread(_write, path, input_data.get("content", ""), src)
 
     elif name == "edit_file":
         path = _resolve_path(input_data["path"])
         if not os.path.exists(path):
             return f"File not found: {path}"
-        with open(path, "r") as f:
-            content = f.read()
-        old_text = input_data["old_text"]
-        count = content.count(old_text)
-        if count == 0:
-            return f"Text not found in {path}"
-        if count > 1:
-            return f"Text appears {count} times in {path} — must be unique. Provide more context."
-        new_content = content.replace(old_text, input_data["new_text"], 1)
-        with open(path, "w") as f:
-            f.write(new_content)
-        return f"Edited {path}: replaced 1 occurrence."
+        return await asyncio.to_thread(_edit_file, path, input_data["old_text"], input_data["new_text"])
 
     elif name == "list_files":
         dir_path = _resolve_path(input_data.get("path", ""))
         if not os.path.isdir(dir_path):
             return f"Directory not found: {dir_path}"
         pattern = input_data.get("pattern", "*")
-        matches = glob.glob(os.path.join(dir_path, pattern))
-        if not matches:
+        total, shown = _list_dir(dir_path, pattern)
+        if not total:
             return f"No files matching '{pattern}' in {dir_path}"
         lines = []
-        for m in sorted(matches)[:50]:
-            stat = os.stat(m)
-            size_kb = stat.st_size / 1024
-            name_str = os.path.basename(m)
-            if os.path.isdir(m):
+        for name_str, is_dir, size in shown:
+            size_kb = size / 1024
+            if is_dir:
                 name_str += "/"
             lines.append(f"  {name_str:<40} {size_kb:>8.1f} KB")
-        header = f"[{dir_path}] — {len(matches)} items"
-        if len(matches) > 50:
+        header = f"[{dir_path}] — {total} items"
+        if total > 50:
             header += f" (showing first 50)"
         return header + "\n" + "\n".join(lines)
 
     elif name == "search_files":
-        import re
         base = THESIS_DIR
         file_pat = input_data.get("file_pattern", "**/*")
         search_pat = input_data["pattern"]
-        matches = []
-        for filepath in glob.glob(os.path.join(base, file_pat), recursive=True):
-            if os.path.isdir(filepath):
-                continue
-            try:
-                with open(filepath, "r") as f:
-                    for i, line in enumerate(f, 1):
-                        if re.search(search_pat, line, re.IGNORECASE):
-                            rel = os.path.relpath(filepath, base)
-                            matches.append(f"  {rel}:{i}: {line.rstrip()}")
-                            if len(matches) >= 20:
-                                break
-            except (UnicodeDecodeError, PermissionError):
-                continue
-            if len(matches) >= 20:
-                break
+        matches = await _rg_search(base, file_pat, search_pat)
+        if matches is None:
+            # Blocking walk + reads: keep the event loop (and other tools) running
+            matches = await asyncio.to_thread(_search_files, base, file_pat, search_pat)
         if not matches:
             return f"No matches for '{search_pat}'"
         return f"Found {len(matches)} matches:\n" + "\n".join(matches)
@@ -4,8 +4,9 @@ Runs Python scripts and shell commands with timeout and output capture.
 """
 import asyncio
 import os
-import tempfile
-from config import THESIS_DIR
+import re
+import shlex
+from config import RUN_PYTHON_PREIMPORTS, THESIS_DIR
 
 SCRIPT_TOOLS = [
     {
@@ -69,6 +70,262 @@ SCRIPT_TOOLS = [
 ]
 
 
+# run_python hands each snippet to an interpreter started ahead of time, which
+# has already paid for startup and the heavy data-science imports. It reads
+# the code from stdin and runs it as __main__; each snippet still gets its
+# own process. The source goes into linecache so tracebacks show its lines.
+_WARM_BOOT = f"""
+import linecache
+import sys
+for _name in {RUN_PYTHON_PREIMPORTS!r}:
+    try:
+        __import__(_name)
+    except ImportError:
+        pass
+del _name
+_src = sys.stdin.read()
+if not _src:
+    sys.exit()
+linecache.cache["<run_python>"] = (len(_src), None, _src.splitlines(True), "<run_python>")
+sys.argv = ["-"]
+try:
+    exec(compile(_src, "<run_python>", "exec"), {{"__name__": "__main__", "__builtins__": __builtins__}})
+except SystemExit:
+    raise
+except BaseException as _e:
+    import traceback
+    # Printed here rather than at exit so linecache is used; skip this frame
+    traceback.print_exception(type(_e), _e, _e.__traceback__.tb_next)
+    sys.exit(1)
+"""
+_spare_python: asyncio.subprocess.Process | None = None
+
+
+async def _spawn_python() -> asyncio.subprocess.Process:
+    env = os.environ.copy()
+    env["THESIS_DIR"] = THESIS_DIR
+    return await asyncio.create_subprocess_exec(
+        "python3", "-c", _WARM_BOOT,
+        stdin=asyncio.subprocess.PIPE,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE,
+        cwd=THESIS_DIR,
+        env=env,
+    )
+
+
+async def _take_python() -> asyncio.subprocess.Process:
+    """The spare interpreter (or a fresh one if it's gone), starting its replacement."""
+    global _spare_python
+    process, _spare_python = _spare_python, None
+    if process is None or process.returncode is not None:
+        process = await _spawn_python()
+    spare = await _spawn_python()
+    if _spare_python is None:
+        _spare_python = spare
+    else:  # a concurrent call got there first
+        spare.kill()
+    return process
+
+
+# Bytes kept per output stream. execute_tool cuts results to ~8k chars anyway;
+# this just stops a runaway print loop from buffering unbounded output.
+_OUTPUT_CAP = 256 * 1024
+
+
+async def _drain_capped(stream: asyncio.StreamReader, cap: int = _OUTPUT_CAP) -> bytes:
+    """Read a pipe to EOF, keeping only the first cap bytes.
+
+    The rest is read and dropped rather than killing the process, so a chatty
+    script can still finish the work it was run for.
+    """
+    buf = bytearray()
+    total = 0
+    while chunk := await stream.read(65536):
+        total += len(chunk)
+        if len(buf) < cap:
+            buf += chunk[:cap - len(buf)]
+    if total > cap:
+        buf += f"\n... [output truncated, {total} bytes total]".encode()
+    return bytes(buf)
+
+
+async def _communicate(process: asyncio.subprocess.Process, stdin: bytes | None = None) -> tuple[bytes, bytes]:
+    """Like process.communicate(), but with each output stream capped by _drain_capped."""
+    async def feed():
+        if stdin is None:
+            return
+        process.stdin.write(stdin)
+        try:
+            await process.stdin.drain()
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+        process.stdin.close()
+
+    stdout, stderr, _ = await asyncio.gather(
+        _drain_capped(process.stdout), _drain_capped(process.stderr), feed(),
+    )
+    await process.wait()
+    return stdout, stderr
+
+
+# The original substring screen; always applied, the token checks only add to it
+_DANGEROUS_SUBSTRINGS = re.compile("|".join(map(re.escape, [
+    "rm -rf /", "mkfs", "dd if=", "> /dev/", ":(){ :|:& };:",
+])))
+_ENV_ASSIGNMENT = re.compile(r"\w+=")
+_SHELL_PUNCTUATION = "();<>|&\n"
+_SHELL_SEPARATOR = re.compile(r"[;&|\n(){}]+|\(\)")
+# Commands that run another command, with the options of theirs that take a
+# separate value word. Their options are skipped to find the real command.
+_COMMAND_WRAPPERS: dict[str, frozenset[str]] = {
+    "sudo": frozenset({"-u", "-g", "-C", "-D", "-h", "-p", "-r", "-t", "-T", "-U", "--user", "--group"}),
+    "env": frozenset({"-u", "-C", "--unset", "--chdir"}),
+    "nohup": frozenset(),
+    "nice": frozenset({"-n", "--adjustment"}),
+    "time": frozenset({"-f", "-o", "--format", "--output"}),
+    "timeout": frozenset({"-s", "-k", "--signal", "--kill-after"}),
+    "stdbuf": frozenset({"-i", "-o", "-e", "--input", "--output", "--error"}),
+    "command": frozenset(),
+    "exec": frozenset({"-a"}),
+    "xargs": frozenset({"-a", "-d", "-E", "-I", "-L", "-n", "-P", "-s", "--arg-file", "--delimiter", "--max-args"}),
+}
+_SAFE_DEVICES = frozenset({"/dev/null", "/dev/stdout", "/dev/stderr", "/dev/tty"})
+# name(){ ... name|name ... } — a function that pipes into itself (fork bomb)
+_FORK_BOMB = re.compile(r"(\S+?)\(\)\{.*\1\|\1")
+
+
+def _is_dangerous(command: str) -> bool:
+    """Whether a run_shell command looks destructive.
+
+    The original substring screen always applies. On top of it, shell tokens
+    are checked so that extra spaces, rm -fR ~, /bin/rm, wrappers such as
+    sudo/env/timeout, and sh -c / eval payloads don't slip past it.
+    """
+    if _DANGEROUS_SUBSTRINGS.search(command):
+        return True
+    if _FORK_BOMB.search("".join(command.split())):
+        return True
+    lexer = shlex.shlex(command, posix=True, punctuation_chars=_SHELL_PUNCTUATION)
+    lexer.whitespace = " \t\r"
+    lexer.whitespace_split = True
+    try:
+        tokens = list(lexer)
+    except ValueError:  # unbalanced quotes: the shell won't run it either
+        return False
+
+    for i, tok in enumerate(tokens):
+        if tok in (">", ">>", ">|", "&>", ">&") and i + 1 < len(tokens):
+            target = tokens[i + 1]
+            if target.startswith("/dev/") and target not in _SAFE_DEVICES:
+                return True
+
+    simple: list[str] = []
+    for tok in [*tokens, ";"]:
+        if not _SHELL_SEPARATOR.fullmatch(tok):
+            simple.append(tok)
+            continue
+        if simple and _is_dangerous_simple(simple):
+            return True
+        simple = []
+    return False
+
+
+def _strip_wrappers(words: list[str]) -> list[str]:
+    """words with leading VAR=value assignments and wrapper commands (plus their options) removed."""
+    i = 0
+    while i < len(words):
+        if _ENV_ASSIGNMENT.match(words[i]):
+            i += 1
+            continue
+        wrapper = os.path.basename(words[i])
+        if wrapper not in _COMMAND_WRAPPERS:
+            break
+        takes_value = _COMMAND_WRAPPERS[wrapper]
+        i += 1
+        while i < len(words):
+            word = words[i]
+            if word == "--":
+                i += 1
+                break
+            if wrapper == "env" and word in ("-S", "--split-string") and i + 1 < len(words):
+                # The value is itself a command line
+                try:
+                    inner = shlex.split(words[i + 1])
+                except ValueError:
+                    return words[i + 1:]
+                return _strip_wrappers(inner + words[i + 2:])
+            if wrapper == "env" and _ENV_ASSIGNMENT.match(word):
+                i += 1
+            elif word.startswith("-") and len(word) > 1:
+                i += 2 if word in takes_value else 1
+            else:
+                break
+        if wrapper == "timeout" and i < len(words):
+            i += 1  # the duration
+    return words[i:]
+
+
+def _is_dangerous_simple(words: list[str]) -> bool:
+    """_is_dangerous for one simple command (no separators)."""
+    words = _strip_wrappers(words)
+    if not words:
+        return False
+    name, args = os.path.basename(words[0]), words[1:]
+    if name in ("sh", "bash", "zsh", "dash") and "-c" in args:
+        idx = args.index("-c") + 1
+        return idx < len(args) and _is_dangerous(args[idx])
+    if name == "eval":
+        return _is_dangerous(" ".join(args))
+    if name.startswith("mkfs"):
+        return True
+    if name == "dd":
+        return any(a.startswith("if=") for a in args)
+    if name == "rm":
+        # Everything after "--" is a filename, even if it starts with "-"
+        end = args.index("--") if "--" in args else len(args)
+        flags = [a for a in args[:end] if a.startswith("-")]
+        recursive = "--recursive" in flags or any(
+            not f.startswith("--") and ("r" in f or "R" in f) for f in flags
+        )
+        targets = [a for a in args[:end] if not a.startswith("-")] + args[end + 1:]
+        return recursive and any(t.startswith(("/", "~", "$HOME")) for t in targets)
+    return False
+
+
+async def _run(
+    process: asyncio.subprocess.Process, timeout: float, stdin: bytes | None = None,
+) -> tuple[str, str] | None:
+    """Decoded (stdout, stderr) of process, or None if it was killed for exceeding timeout."""
+    try:
+        stdout, stderr = await asyncio.wait_for(_communicate(process, stdin), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+        return None
+    return stdout.decode(errors="replace"), stderr.decode(errors="replace")
+
+
+def _format_script_result(stdout: str, stderr: str, returncode: int, empty: str) -> str:
+    """run_python / run_script result: labelled streams, plus the exit code on failure."""
+    result_parts = []
+    if stdout:
+        result_parts.append(f"STDOUT:\n{stdout}")
+    if stderr:
+        result_parts.append(f"STDERR:\n{stderr}")
+    if returncode != 0:
+        result_parts.append(f"Exit code: {returncode}")
+    return "\n".join(result_parts) if result_parts else empty
+
+
+async def _spawn(*cmd: str, shell: bool = False) -> asyncio.subprocess.Process:
+    """Start a run_script / run_shell process in THESIS_DIR with piped output."""
+    pipes = dict(stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE, cwd=THESIS_DIR)
+    if shell:
+        return await asyncio.create_subprocess_shell(cmd[0], **pipes)
+    return await asyncio.create_subprocess_exec(*cmd, **pipes)
+
+
 async def handle_script_tool(name: str, input_data: dict) -> str:
     """Handle script execution tools."""
 
@@ -76,42 +333,13 @@ async def handle_script_tool(name: str, input_data: dict) -> str:
         code = input_data["code"]
         timeout = input_data.get("timeout", 120)
 
-        # Write code to a temp file and execute it
-        with tempfile.NamedTemporaryFile(mode="w", suffix=".py", delete=False, dir=THESIS_DIR) as f:
-            # Add common imports preamble
-            preamble = "import os; os.chdir(os.environ.get('THESIS_DIR', '.'))\n"
-            f.write(preamble + code)
-            script_path = f.name
-
-        try:
-            env = os.environ.copy()
-            env["THESIS_DIR"] = THESIS_DIR
-            process = await asyncio.create_subprocess_exec(
-                "python3", script_path,
-                stdout=asyncio.subprocess.PIPE,
-                stderr=asyncio.subprocess.PIPE,
-                cwd=THESIS_DIR,
-                env=env,
-            )
-            try:
-                stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-            except asyncio.TimeoutError:
-                process.kill()
-                return f"⏱️ Script timed out after {timeout}s"
-
-            result_parts = []
-            if stdout:
-                out = stdout.decode(errors="replace")
-                result_parts.append(f"STDOUT:\n{out}")
-            if stderr:
-                err = stderr.decode(errors="replace")
-                result_parts.append(f"STDERR:\n{err}")
-            if process.returncode != 0:
-                result_parts.append(f"Exit code: {process.returncode}")
-
-            return "\n".join(result_parts) if result_parts else "Script completed successfully (no output)."
-        finally:
-            os.unlink(script_path)
+        # Add common imports preamble
+        preamble = "import os; os.chdir(os.environ.get('THESIS_DIR', '.'))\n"
+        process = await _take_python()
+        output = await _run(process, timeout, (preamble + code).encode())
+        if output is None:
+            return f"⏱️ Script timed out after {timeout}s"
+        return _format_script_result(*output, process.returncode, "Script completed successfully (no output).")
 
     elif name == "run_script":
         path = input_data["path"]
@@ -125,56 +353,37 @@ async def handle_script_tool(name: str, input_data: dict) -> str:
 
         cmd = ["python3", path]
         if args_str:
-            cmd.extend(args_str.split())
+            # Quoted arguments ("--out 'my dir/x.csv'") stay one argument
+            try:
+                cmd.extend(shlex.split(args_str))
+            except ValueError as e:
+                return f"Could not parse args: {e}"
 
-        process = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=THESIS_DIR,
-        )
-        try:
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        except asyncio.TimeoutError:
-            process.kill()
+        process = await _spawn(*cmd)
+        output = await _run(process, timeout)
+        if output is None:
             return f"⏱️ Script timed out after {timeout}s"
-
-        result_parts = []
-        if stdout:
-            result_parts.append(f"STDOUT:\n{stdout.decode(errors='replace')}")
-        if stderr:
-            result_parts.append(f"STDERR:\n{stderr.decode(errors='replace')}")
-        if process.returncode != 0:
-            result_parts.append(f"Exit code: {process.returncode}")
-
-        return "\n".join(result_parts) if result_parts else "Script completed (no output)."
+        return _format_script_result(*output, process.returncode, "Script completed (no output).")
 
     elif name == "run_shell":
         command = input_data["command"]
         timeout = input_data.get("timeout", 30)
 
         # Block dangerous commands
-        dangerous = ["rm -rf /", "mkfs", "dd if=", "> /dev/", ":(){ :|:& };:"]
-        if any(d in command for d in dangerous):
+        if _is_dangerous(command):
             return "❌ Blocked: potentially dangerous command."
 
-        process = await asyncio.create_subprocess_shell(
-            command,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
-            cwd=THESIS_DIR,
-        )
-        try:
-            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
-        except asyncio.TimeoutError:
-            process.kill()
+        process = await _spawn(command, shell=True)
+        output = await _run(process, timeout)
+        if output is None:
             return f"⏱️ Command timed out after {timeout}s"
+        stdout, stderr = output
 
         result_parts = []
         if stdout:
-            result_parts.append(stdout.decode(errors="replace"))
+            result_parts.append(stdout)
         if stderr:
-            result_parts.append(f"STDERR: {stderr.decode(errors='replace')}")
+            result_parts.append(f"STDERR: {stderr}")
 
         return "\n".join(result_parts) if result_parts else "Command completed (no output)."
 